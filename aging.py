@@ -0,0 +1,122 @@
+from collections import namedtuple
+from datetime import date, timedelta
+
+import numpy as np
+
+# Payment status codes, in the order of STATUS_NAMES
+PAID, PENDING, DUE_SOON, OVERDUE = range(4)
+STATUS_NAMES = ("Paid", "Pending", "Due Within 7 Days", "Overdue")
+
+# Unpaid charges due within this many days are "Due Within 7 Days"
+DUE_SOON_DAYS = 7
+
+# Aging buckets by days past due of the oldest unpaid charge; "Current" is not past due
+AGING_BUCKETS = ("Current", "1-30", "31-60", "61-90", "90+")
+AGING_EDGES = (31, 61, 91)
+
+FORECAST_WEEKS = 4
+
+# Overview counters (see facility_summary) for each status
+STATUS_COUNTERS = {PAID: "paid", DUE_SOON: "upcoming_due", OVERDUE: "overdue"}
+
+Aging = namedtuple("Aging", ["as_of", "status", "days_past_due", "periods_due", "amount_due", "bucket"])
+
+
+def due_dates(months, due_day):
+    """Each resident's due date in the given months (datetime64[M]), clamped to the month's length."""
+    first = months.astype("datetime64[D]")
+    days_in_month = ((months + 1).astype("datetime64[D]") - first).astype(np.int64)
+    return first + (np.minimum(due_day, days_in_month) - 1)
+
+
+class PaymentBook:
+    """Every resident's payment terms as arrays, for status and aging as of any date.
+
+    Built once from an occupancy dict (facility -> [Resident]); evaluate() then
+    computes status, days past due and amount owed for all residents at once.
+    A resident's standing is the last due date their payments cover
+    (paid_through). When the server doesn't send it, it is inferred from the
+    status at load: Paid covers this month's due date; anything else covers
+    last month's, or the month before when already Overdue ahead of this
+    month's due date.
+    """
+
+    def __init__(self, occupancy, today=None):
+        today = np.datetime64(today or date.today(), "D")
+        self.facilities = list(occupancy)
+        self.residents = [r for f in self.facilities for r in occupancy[f]]
+        self.facility = np.repeat(np.arange(len(self.facilities)), [len(occupancy[f]) for f in self.facilities])
+        self.due_day = np.array([r.due_day for r in self.residents], dtype=np.int64)
+        self.amount = np.array([r.amount for r in self.residents], dtype=np.float64)
+
+        paid_through = np.array([r.paid_through or "NaT" for r in self.residents], dtype="datetime64[D]")
+        status = np.array([r.status for r in self.residents], dtype=object)
+        month = np.full(len(self.residents), today.astype("datetime64[M]"))
+        this_due = due_dates(month, self.due_day)
+        # Overdue before this month's due date means last month's charge is still open
+        behind = (status == "Overdue") & (this_due > today)
+        inferred = np.where(
+            status == "Paid", this_due,
+            np.where(behind, due_dates(month - 2, self.due_day), due_dates(month - 1, self.due_day))
+        )
+        self.paid_through = np.where(np.isnat(paid_through), inferred, paid_through)
+
+    def __len__(self):
+        return len(self.residents)
+
+    def evaluate(self, as_of):
+        """Status, days past due, unpaid charges and their total for every resident on a date."""
+        day = np.datetime64(as_of, "D")
+        month = day.astype("datetime64[M]")
+        first_unpaid = due_dates(self.paid_through.astype("datetime64[M]") + 1, self.due_day)
+        unpaid_month = first_unpaid.astype("datetime64[M]")
+        this_due = due_dates(np.full(len(self), month), self.due_day)
+
+        overdue = first_unpaid <= day
+        days_past_due = np.where(overdue, (day - first_unpaid).astype(np.int64), 0)
+        periods_due = np.where(overdue, (month - unpaid_month).astype(np.int64) + (this_due <= day), 0)
+        status = np.select(
+            [overdue, unpaid_month > month, (first_unpaid - day).astype(np.int64) <= DUE_SOON_DAYS],
+            [OVERDUE, PAID, DUE_SOON],
+            PENDING,
+        )
+        bucket = np.where(overdue, np.digitize(days_past_due, AGING_EDGES) + 1, 0)
+        return Aging(as_of, status, days_past_due, periods_due, periods_due * self.amount, bucket)
+
+    def by_facility(self, values):
+        """Sum a per-resident array per facility."""
+        return np.bincount(self.facility, weights=values, minlength=len(self.facilities))
+
+    def facility_rows(self, aging):
+        """Per facility: overview counters for the date, plus amounts past due by aging bucket."""
+        rows = {f: {} for f in self.facilities}
+        for code, counter in STATUS_COUNTERS.items():
+            for f, n in zip(self.facilities, self.by_facility(aging.status == code)):
+                rows[f][counter] = int(n)
+        for i, name in enumerate(AGING_BUCKETS):
+            for f, amount in zip(self.facilities, self.by_facility(np.where(aging.bucket == i, aging.amount_due, 0))):
+                rows[f][name] = float(amount)
+        for f, amount in zip(self.facilities, self.by_facility(aging.amount_due)):
+            rows[f]["past_due"] = float(amount)
+        return rows
+
+    def overdue(self, aging, limit=None):
+        """(resident index, days past due, amount due) for overdue residents, longest overdue first."""
+        order = np.flatnonzero(aging.status == OVERDUE)
+        order = order[np.argsort(-aging.days_past_due[order], kind="stable")][:limit]
+        return [(int(i), int(aging.days_past_due[i]), float(aging.amount_due[i])) for i in order]
+
+    def forecast(self, as_of, weeks=FORECAST_WEEKS):
+        """Charges falling due after as_of, assuming nobody pays early: [(week start, amount, residents)]."""
+        day = np.datetime64(as_of, "D")
+        end = day + 7 * weeks
+        month = day.astype("datetime64[M]")
+        amounts = np.zeros(weeks)
+        counts = np.zeros(weeks, dtype=np.int64)
+        for offset in range(weeks * 7 // 28 + 2):
+            due = due_dates(np.full(len(self), month + offset), self.due_day)
+            falling_due = (due > day) & (due <= end) & (due > self.paid_through)
+            week = ((due[falling_due] - day).astype(np.int64) - 1) // 7
+            amounts += np.bincount(week, weights=self.amount[falling_due], minlength=weeks)
+            counts += np.bincount(week, minlength=weeks)
+        return [(as_of + timedelta(days=7 * w + 1), float(amounts[w]), int(counts[w])) for w in range(weeks)]
@@ -0,0 +1,117 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+# Where snapshots are kept between runs
+CACHE_DIR = os.environ.get("HAVENLEDGER_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".havenledger", "cache"))
+
+# Staleness policy (seconds)
+FRESH_FOR = 60  # Younger than this: served without revalidating at all
+MAX_STALE = 7 * 24 * 3600  # Older than this: never served, always refetched
+
+# Total size cap for all snapshots; oldest are evicted first
+MAX_CACHE_BYTES = 50 * 1024 * 1024
+
+
+class SnapshotCache:
+    """On-disk store of the last response per endpoint, with its ETag / Last-Modified validators."""
+
+    def __init__(self, directory=CACHE_DIR, fresh_for=FRESH_FOR, max_stale=MAX_STALE, max_bytes=MAX_CACHE_BYTES):
+        self.directory = directory
+        self.fresh_for = fresh_for
+        self.max_stale = max_stale
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+
+    def path(self, url):
+        name = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{name}.json")
+
+    def load(self, url):
+        """Return the cached entry for a URL, or None if missing, unreadable or too stale."""
+        try:
+            with open(self.path(url), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if entry.get("url") != url or self.age(entry) > self.max_stale:
+            return None
+        return entry
+
+    def store(self, url, data, etag=None, last_modified=None):
+        """Save a snapshot atomically, then enforce the size cap."""
+        entry = {
+            "url": url,
+            "etag": etag,
+            "last_modified": last_modified,
+            "stored_at": time.time(),
+            "data": data
+        }
+        self.write(url, entry)
+        self.enforce_size_cap()
+        return entry
+
+    def mark_missing(self, url):
+        """Remember that the server has no such endpoint, so it isn't requested again until max_stale."""
+        entry = {"url": url, "missing": True, "stored_at": time.time(), "data": None}
+        self.write(url, entry)
+        return entry
+
+    def touch(self, url, entry):
+        """Mark a snapshot as just revalidated (after a 304 Not Modified)."""
+        entry["stored_at"] = time.time()
+        self.write(url, entry)
+
+    def write(self, url, entry):
+        path = self.path(url)
+        with self.lock:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, path)
+
+    def age(self, entry):
+        return time.time() - entry.get("stored_at", 0)
+
+    def is_fresh(self, entry):
+        return self.age(entry) < self.fresh_for
+
+    def validators(self, entry):
+        """Conditional request headers for revalidating a cached entry."""
+        headers = {}
+        if entry and entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry and entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def enforce_size_cap(self):
+        """Delete the least recently stored snapshots until the cache fits in max_bytes."""
+        with self.lock:
+            try:
+                files = [os.path.join(self.directory, name) for name in os.listdir(self.directory) if name.endswith(".json")]
+                stats = [(os.path.getmtime(path), os.path.getsize(path), path) for path in files]
+            except OSError:
+                return
+
+            total = sum(size for _, size, _ in stats)
+            for _, size, path in sorted(stats):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except OSError:
+                    pass
+
+    def clear(self):
+        with self.lock:
+            if not os.path.isdir(self.directory):
+                return
+            for name in os.listdir(self.directory):
+                if name.endswith(".json"):
+                    os.remove(os.path.join(self.directory, name))
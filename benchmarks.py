@@ -0,0 +1,271 @@
+"""Client performance benchmarks against the local mock server.
+
+Times cold and warm startup loads, opening a facility, the individual
+fetches, converting JSON to records, overview aggregation, resident search,
+payment aging and facility window construction for each portfolio size, and
+writes the results as JSON:
+
+    python benchmarks.py --sizes 1 10 100 500 --latency 0.02 --output results.json
+    python benchmarks.py --baseline results.json   # exit status 1 on regressions
+    python benchmarks.py --sizes 10 --tls-cert cert.pem --tls-key key.pem   # over HTTPS
+
+Everything runs against mock_server on a free local port, with a throwaway
+cache, journal and import directory, so runs are reproducible and never
+touch production or your real ~/.havenledger.
+"""
+import os
+import tempfile
+
+# Must be set before the client modules read them at import
+WORK_DIR = tempfile.mkdtemp(prefix="havenledger-bench-")
+os.environ["HAVENLEDGER_CACHE_DIR"] = os.path.join(WORK_DIR, "cache")
+os.environ["HAVENLEDGER_JOURNAL"] = os.path.join(WORK_DIR, "journal.sqlite3")
+os.environ["HAVENLEDGER_IMPORT_DIR"] = os.path.join(WORK_DIR, "imports")
+
+import argparse
+import json
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+
+import api_functions as api
+from aging import PaymentBook
+from data_store import DataStore
+from facility_summary import FacilitySummary
+from mock_server import MockBackend, start_in_background
+from models import residents_from_json, rooms_from_json
+from resident_search import ResidentIndex
+from room_index import RoomIndex
+
+DEFAULT_SIZES = (1, 10, 100, 500)
+DEFAULT_REPEAT = 5
+
+# Resident search queries: prefix, token prefix, substring, one typo, no match
+SEARCH_QUERIES = ("mar", "garcia", "atel", "jonhson", "zzzz")
+
+# A regression is a median slower than the baseline by this fraction, and by at least NOISE_FLOOR seconds
+REGRESSION_THRESHOLD = 0.20
+NOISE_FLOOR = 0.001
+
+# What the overview loads on launch, by store dataset
+STARTUP_FETCHES = {
+    "facility_info": api.fetch_facility_info,
+    "facility_summary": api.fetch_facility_summaries,
+}
+
+# Every fetch, timed on its own with a cold cache
+FETCHES = {
+    "facility_info": api.fetch_facility_info,
+    "facility_summary": api.fetch_facility_summaries,
+    "room_details": api.fetch_room_details,
+    "room_occupancy": api.fetch_room_occupancy,
+}
+
+
+def summarize(times):
+    times = sorted(times)
+    return {
+        "runs": len(times),
+        "min": times[0],
+        "median": statistics.median(times),
+        "mean": statistics.fmean(times),
+        "max": times[-1],
+    }
+
+
+def measure(fn, repeat, setup=None):
+    """Time fn() repeat times (setup() runs untimed before each call)."""
+    times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return summarize(times)
+
+
+def clear_cache():
+    api.cache.clear()
+
+
+def new_store():
+    """A store with the same derived indexes main.py subscribes."""
+    store = DataStore()
+    for index in (ResidentIndex(store.resident_directory), RoomIndex(store.room_details, store.room_occupancy),
+                  FacilitySummary(store.room_details, store.room_occupancy, store.facility_summary)):
+        store.subscribe(index.on_change)
+    return store
+
+
+def startup_load():
+    """What the overview does on launch: the startup fetches concurrently, each loaded into a store with its indexes."""
+    store = new_store()
+    with ThreadPoolExecutor(max_workers=len(STARTUP_FETCHES)) as pool:
+        futures = {name: pool.submit(fetch) for name, fetch in STARTUP_FETCHES.items()}
+        for name, future in futures.items():
+            store.load(name, future.result())
+    return store
+
+
+def facility_window_benchmarks(store, repeat, create_windows):
+    """FacilityView construction for the largest facility. Needs the GUI modules."""
+    import main
+
+    for name in STARTUP_FETCHES:
+        main.store.load(name, getattr(store, name))
+    facility_name = max(store.facility_summary, key=lambda f: store.facility_summary[f]["total_residents"])
+    main.store.ensure_facility(facility_name)
+
+    results = {"facility_window_layout": measure(lambda: main.FacilityView(None, facility_name).layout(), repeat)}
+    if create_windows:
+        def open_and_close():
+            view = main.FacilityView(None, facility_name)
+            view.create()
+            view.close()
+        results["facility_window_create"] = measure(open_and_close, repeat)
+    return results
+
+
+def run_size(facilities, args):
+    backend = MockBackend(facilities, seed=args.seed, latency=args.latency, jitter=args.jitter)
+    server, base_url = start_in_background(backend, certfile=args.tls_cert, keyfile=args.tls_key)
+    api.configure_client(base_url, verify=args.tls_cert or True)
+    results = {}
+    try:
+        # Cold start: empty snapshot cache, full payloads
+        results["cold_start"] = measure(startup_load, args.repeat, setup=clear_cache)
+        # Warm start: cached snapshots revalidated with 304s
+        results["warm_start"] = measure(startup_load, args.repeat)
+
+        # Opening a facility: its rooms and residents fetched into a fresh store
+        facility_name = next(iter(backend.facility_info))
+        results["open_facility"] = measure(lambda: new_store().ensure_facility(facility_name), args.repeat)
+
+        for name, fetch in FETCHES.items():
+            results[f"fetch_{name}"] = measure(fetch, args.repeat, setup=clear_cache)
+        results["fetch_facility_slice"] = measure(lambda: api.fetch_facility_occupancy(facility_name), args.repeat)
+
+        # Aggregation and search over the whole portfolio's records
+        def convert():
+            return (
+                {f: rooms_from_json(rooms) for f, rooms in room_details_json.items()},
+                {f: residents_from_json(residents) for f, residents in room_occupancy_json.items()},
+            )
+
+        room_details_json, room_occupancy_json = api.fetch_room_details(), api.fetch_room_occupancy()
+        results["model_conversion"] = measure(convert, args.repeat)
+        room_details, room_occupancy = convert()
+        results["overview_aggregation"] = measure(lambda: FacilitySummary(room_details, room_occupancy), args.repeat)
+        results["search_index_build"] = measure(lambda: ResidentIndex(room_occupancy), args.repeat)
+        index = ResidentIndex(room_occupancy)
+        book = PaymentBook(room_occupancy)
+        results["aging_evaluate"] = measure(lambda: book.facility_rows(book.evaluate(date.today() + timedelta(days=30))), args.repeat)
+
+        store = startup_load()
+        results["resident_search"] = measure(
+            lambda: [index.search(query) for query in SEARCH_QUERIES], args.repeat
+        )
+
+        if not args.skip_gui:
+            results.update(facility_window_benchmarks(store, args.repeat, args.windows))
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    residents = sum(len(r) for r in backend.room_occupancy.values())
+    rooms = sum(len(r) for r in backend.room_details.values())
+    return {"facilities": facilities, "rooms": rooms, "residents": residents, "benchmarks": results}
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)), check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, threshold=REGRESSION_THRESHOLD):
+    """(size, benchmark, baseline median, new median) for every regression."""
+    regressions = []
+    for size, run in results["runs"].items():
+        old_run = baseline.get("runs", {}).get(size)
+        if not old_run:
+            continue
+        for name, stats in run["benchmarks"].items():
+            old = old_run["benchmarks"].get(name)
+            if old is None:
+                continue
+            slower = stats["median"] - old["median"]
+            if slower > NOISE_FLOOR and stats["median"] > old["median"] * (1 + threshold):
+                regressions.append((size, name, old["median"], stats["median"]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the HavenLedger client against the local mock server.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Portfolio sizes, in facilities (1-500)")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds the mock server adds to every request")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="Earlier results file to check for regressions")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    parser.add_argument("--skip-gui", action="store_true", help="Skip the facility window benchmarks (no PySimpleGUI needed)")
+    parser.add_argument("--windows", action="store_true", help="Also time creating real windows (needs a display)")
+    parser.add_argument("--tls-cert", help="Run over HTTPS: the mock server's self-signed certificate (PEM), trusted by the client")
+    parser.add_argument("--tls-key", help="Private key for --tls-cert, if not in the same file")
+    args = parser.parse_args()
+
+    if any(not 1 <= size <= 500 for size in args.sizes):
+        parser.error("--sizes must be between 1 and 500")
+
+    results = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+            "seed": args.seed,
+            "latency": args.latency,
+            "jitter": args.jitter,
+            "https": bool(args.tls_cert),
+        },
+        "runs": {},
+    }
+
+    try:
+        for size in args.sizes:
+            run = run_size(size, args)
+            results["runs"][str(size)] = run
+            print(f"{size} facilities ({run['residents']} residents):")
+            for name, stats in run["benchmarks"].items():
+                print(f"  {name:<28} median {stats['median'] * 1000:9.2f} ms   min {stats['min'] * 1000:9.2f} ms")
+    finally:
+        shutil.rmtree(WORK_DIR, ignore_errors=True)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for size, name, old, new in regressions:
+            print(f"REGRESSION {name} at {size} facilities: {old * 1000:.2f} ms -> {new * 1000:.2f} ms")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+import csv
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import api_functions as api
+from models import normalize_room
+from validation import validate_facility, validate_resident, validate_room
+
+# Where per-file progress is kept so an interrupted import can resume
+IMPORT_PROGRESS_DIR = os.environ.get("HAVENLEDGER_IMPORT_DIR", os.path.join(os.path.expanduser("~"), ".havenledger", "imports"))
+
+# Submission limits
+MAX_CONCURRENT = 4
+REQUESTS_PER_SECOND = 5
+
+# Rows are submitted in this order so facilities exist before their rooms, and rooms before residents
+ROW_TYPES = ("facility", "room", "resident")
+
+ImportRow = namedtuple("ImportRow", ["line", "row_type", "facility_name", "fields"])
+# skipped: the facility or room already existed, so nothing was sent
+RowResult = namedtuple("RowResult", ["line", "row_type", "facility_name", "ok", "message", "skipped"], defaults=(False,))
+
+
+def read_rows(path):
+    """Read an import file (CSV with a header row, or a JSON list of objects).
+
+    Every row has a "type" of facility, room or resident, a "facility_name",
+    and the fields for that type: total_beds; room_number; or room_number,
+    resident_name, monthly_payment, payment_due_date and move_in_date.
+    """
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        if path.lower().endswith(".json"):
+            records = json.load(f)
+            if not isinstance(records, list) or not all(isinstance(r, dict) for r in records):
+                raise ValueError("a JSON import file must be a list of objects, one per row")
+            first_line = 1
+        else:
+            records = list(csv.DictReader(f))
+            first_line = 2  # Line 1 is the header
+
+    rows = []
+    for line, record in enumerate(records, start=first_line):
+        record = {str(k).strip().lower(): ("" if v is None else str(v).strip()) for k, v in record.items()}
+        rows.append(ImportRow(line, record.pop("type", "").lower(), record.pop("facility_name", ""), record))
+    return rows
+
+
+def validate_row(row):
+    """Cleaned API arguments for a row, or (None, error message)."""
+    if row.row_type not in ROW_TYPES:
+        return None, f"Unknown row type {row.row_type!r} (expected facility, room or resident)."
+    if not row.facility_name:
+        return None, "Missing facility_name."
+
+    fields = row.fields
+    if row.row_type == "facility":
+        return validate_facility(row.facility_name, fields.get("total_beds", ""))
+
+    room, error = validate_room(fields.get("room_number", ""))
+    if error or row.row_type == "room":
+        return room, error
+
+    resident, error = validate_resident(
+        fields.get("resident_name", ""), fields.get("monthly_payment", ""),
+        fields.get("payment_due_date", ""), fields.get("move_in_date", "")
+    )
+    if error:
+        return None, error
+    return dict(resident, room_number=room["room_number"]), None
+
+
+def row_key(row, cleaned):
+    """Identifies a row by its content, so progress survives edits to other rows of the file."""
+    content = json.dumps([row.row_type, row.facility_name, cleaned], sort_keys=True)
+    return hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+
+def validate_rows(rows):
+    """Split rows into (row, cleaned arguments) pairs and RowResults for invalid rows."""
+    valid, errors = [], []
+    for row in rows:
+        cleaned, error = validate_row(row)
+        if error:
+            errors.append(RowResult(row.line, row.row_type, row.facility_name, False, error))
+        else:
+            valid.append((row, cleaned))
+    return valid, errors
+
+
+class RateLimiter:
+    """Token bucket shared by the submission threads."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class BulkImporter:
+    """Validates an import file and submits its rows concurrently, rate limited.
+
+    Rows that succeed are appended to a progress file kept per import file
+    path, by row content, so running the file again (say, after fixing the rows
+    that failed) skips them and resumes with whatever failed or never ran.
+    Facilities and rooms that already exist on the server are skipped too,
+    since their requests have no idempotency key to deduplicate them.
+    """
+
+    def __init__(self, path, max_workers=MAX_CONCURRENT, rate=REQUESTS_PER_SECOND, progress_dir=IMPORT_PROGRESS_DIR):
+        self.path = path
+        self.max_workers = max_workers
+        self.limiter = RateLimiter(rate)
+        self.progress_dir = progress_dir
+        self.cancelled = threading.Event()
+
+        self.path_key = hashlib.sha1(os.path.abspath(path).encode("utf-8")).hexdigest()
+        self.rows = read_rows(path)
+        self.valid, self.errors = validate_rows(self.rows)
+
+    @property
+    def progress_path(self):
+        return os.path.join(self.progress_dir, f"{self.path_key}.done")
+
+    def completed_rows(self):
+        """Keys (see row_key) of the rows already imported from this file."""
+        try:
+            with open(self.progress_path, "r", encoding="utf-8") as f:
+                return {line.strip() for line in f if line.strip()}
+        except OSError:
+            return set()
+
+    def remaining(self):
+        done = self.completed_rows()
+        return [(row, cleaned) for row, cleaned in self.valid if row_key(row, cleaned) not in done]
+
+    def existing(self, pending):
+        """(facility names, {facility: room numbers}) already on the server, for the pending rows.
+
+        Facility names are None, and a facility's room numbers None, when they
+        couldn't be fetched.
+        """
+        facilities = api.fetch_facility_info(current_only=True)
+        facilities = None if facilities is None else set(facilities)
+        rooms = {}
+        for facility_name in {row.facility_name for row, _ in pending if row.row_type == "room"} & (facilities or set()):
+            records = api.fetch_facility_rooms(facility_name)
+            rooms[facility_name] = None if records is None else {normalize_room(room["room"]) for room in records}
+        return facilities, rooms
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def submit_row(self, row, cleaned, existing):
+        if self.cancelled.is_set():
+            return RowResult(row.line, row.row_type, row.facility_name, False, "Cancelled")
+
+        # Facilities and rooms can't be deduplicated by the server, so they're only sent when known to be new
+        facility_name = row.facility_name
+        facilities, rooms = existing
+        if row.row_type == "facility":
+            known, key = facilities, facility_name
+        elif row.row_type == "room":
+            # A facility that doesn't exist yet has no rooms
+            known = None if facilities is None else rooms.get(facility_name, set())
+            key = normalize_room(cleaned["room_number"])
+        if row.row_type != "resident":
+            if known is None:
+                return RowResult(row.line, row.row_type, facility_name, False, "Could not check whether it already exists")
+            if key in known:
+                return RowResult(row.line, row.row_type, facility_name, True, "Already exists", skipped=True)
+
+        self.limiter.acquire()
+        try:
+            if row.row_type == "facility":
+                result = api.send_add_facility(facility_name, cleaned["total_beds"])
+                ok = "error" not in result
+            elif row.row_type == "room":
+                result = api.add_room_to_facility(facility_name, cleaned["room_number"])
+                ok = "success" in result
+            else:
+                result = api.add_resident_to_room(
+                    facility_name, cleaned["room_number"], cleaned["resident_name"], cleaned["monthly_payment"],
+                    cleaned["payment_due_date"], cleaned["move_in_date"],
+                    idempotency_key=f"import-{row_key(row, cleaned)}"
+                )
+                ok = "success" in result
+        except Exception as e:
+            result, ok = {"error": str(e)}, False
+
+        message = "Imported" if ok else result.get("error", "Unknown error")
+        return RowResult(row.line, row.row_type, facility_name, ok, message)
+
+    def run(self, on_progress=None):
+        """Submit every remaining valid row; returns a RowResult per row attempted.
+
+        Each stage (facilities, then rooms, then residents) runs concurrently on
+        the pool; on_progress(done, total, result) is called as rows finish.
+        """
+        pending = self.remaining()
+        total = len(pending)
+        results = []
+        existing = self.existing(pending)
+        os.makedirs(self.progress_dir, exist_ok=True)
+
+        with open(self.progress_path, "a", encoding="utf-8") as progress, \
+                ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="import") as pool:
+            for row_type in ROW_TYPES:
+                stage = [(row, cleaned) for row, cleaned in pending if row.row_type == row_type]
+                for (row, cleaned), result in zip(stage, pool.map(lambda item: self.submit_row(*item, existing), stage)):
+                    results.append(result)
+                    if result.ok:
+                        progress.write(f"{row_key(row, cleaned)}\n")
+                        progress.flush()
+                    if on_progress:
+                        on_progress(len(results), total, result)
+
+        return results
@@ -0,0 +1,336 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import api_functions as api
+from facility_summary import summarize_facility
+from models import Resident, Room, estimate_bytes, listings_from_summary, normalize_room, residents_from_json, rooms_from_json
+
+# Facilities whose rooms and residents are kept in memory; the least recently used beyond either cap are dropped
+MAX_LOADED_FACILITIES = 25
+MAX_LOADED_BYTES = 32 * 1024 * 1024
+
+# Rooms and residents of a facility are fetched side by side
+facility_fetches = ThreadPoolExecutor(max_workers=4, thread_name_prefix="facility-load")
+
+
+class DataStore:
+    """Client-side copy of the facility data, updated in place as mutations succeed.
+
+    The overview works from per-facility summaries; a facility's rooms and
+    residents are only fetched when it is opened (ensure_facility) and kept
+    in an LRU capped by count and estimated size. Evicted facilities fall
+    back to a summary computed from their last records.
+
+    API responses are converted to Room and Resident records (models.py)
+    once, as they come in. The dicts are never rebound, so views can hold
+    references to them. Each apply_* method touches only the affected facility and
+    room, and falls back to one scoped fetch of that facility when the server's
+    response doesn't carry the updated records. Listeners are told which dataset
+    and facility changed so derived indexes can update incrementally.
+
+    Changes arrive on worker threads and are made, listeners included, while
+    holding self.lock; code on other threads (the GUI building table rows)
+    holds it too while reading the dicts or the indexes derived from them.
+    """
+
+    def __init__(self, max_facilities=MAX_LOADED_FACILITIES, max_bytes=MAX_LOADED_BYTES):
+        self.facility_info = {}  # facility -> {"total_beds": ...}
+        self.facility_summary = {}  # facility -> overview counters + "residents": [[name, room]]
+        self.room_details = {}  # facility -> [Room], loaded facilities only
+        self.room_occupancy = {}  # facility -> [Resident], loaded facilities only
+        self.resident_directory = {}  # facility -> [Resident] when loaded, else [Listing], for every facility
+        self.loaded = OrderedDict()  # facility -> estimated bytes, least recently used first
+        self.loading = {}  # facility -> Event set when its fetch finishes
+        self.max_facilities = max_facilities
+        self.max_bytes = max_bytes
+        self.lock = threading.RLock()
+        self.listeners = []
+
+    def subscribe(self, listener):
+        """Call listener(dataset, facility_name, changes) after each change.
+
+        facility_name is None after a full reload. changes is a list of
+        (old, new) records when individual records changed (either side may be
+        None), or None when the facility's whole slice was replaced. A facility
+        dropped from memory is announced as dataset "evicted".
+        """
+        self.listeners.append(listener)
+
+    def notify(self, dataset, facility_name=None, changes=None):
+        for listener in self.listeners:
+            listener(dataset, facility_name, changes)
+
+    def load(self, name, data):
+        """Replace a whole dataset ("facility_info" or "facility_summary")."""
+        with self.lock:
+            dataset = getattr(self, name)
+            dataset.clear()
+            dataset.update(data or {})
+            if name == "facility_summary":
+                # Loaded facilities keep indexing their own (fresher) records
+                for facility, summary in self.facility_summary.items():
+                    if facility not in self.loaded:
+                        self.resident_directory[facility] = listings_from_summary(summary)
+                self.notify("resident_directory")
+            self.notify(name)
+
+    def is_loaded(self, facility_name):
+        return facility_name in self.loaded
+
+    def touch(self, facility_name):
+        """Mark a loaded facility as recently used."""
+        with self.lock:
+            if facility_name in self.loaded:
+                self.loaded.move_to_end(facility_name)
+
+    def ensure_facility(self, facility_name):
+        """Make sure a facility's rooms and residents are in memory, fetching them if needed.
+
+        Blocks on the network, so call it off the GUI thread. Concurrent calls
+        for the same facility share one fetch. Returns False if it failed.
+        """
+        with self.lock:
+            if facility_name in self.loaded:
+                self.loaded.move_to_end(facility_name)
+                return True
+            pending = self.loading.get(facility_name)
+            fetching = pending is None
+            if fetching:
+                pending = self.loading[facility_name] = threading.Event()
+
+        if not fetching:
+            pending.wait()
+            return facility_name in self.loaded
+
+        try:
+            rooms = facility_fetches.submit(api.fetch_facility_rooms, facility_name)
+            residents = api.fetch_facility_occupancy(facility_name)
+            rooms = rooms.result()
+            if rooms is None or residents is None:
+                return False
+            self.put_facility(facility_name, rooms, residents)
+            return True
+        finally:
+            with self.lock:
+                del self.loading[facility_name]
+            pending.set()
+
+    def put_facility(self, facility_name, rooms, residents):
+        """Keep a facility's rooms and residents (API JSON) in memory, evicting others past the caps."""
+        rooms, residents = rooms_from_json(rooms), residents_from_json(residents)
+        with self.lock:
+            self.room_details[facility_name] = rooms
+            self.room_occupancy[facility_name] = residents
+            self.resident_directory[facility_name] = residents
+            self.loaded[facility_name] = estimate_bytes(rooms) + estimate_bytes(residents)
+            self.loaded.move_to_end(facility_name)
+            self.notify("room_details", facility_name)
+            self.notify("room_occupancy", facility_name)
+            self.evict()
+
+    def evict(self):
+        """Drop least recently used facilities until within the caps (the latest one always stays)."""
+        with self.lock:
+            while len(self.loaded) > 1 and (len(self.loaded) > self.max_facilities or sum(self.loaded.values()) > self.max_bytes):
+                facility_name, _ = self.loaded.popitem(last=False)
+                rooms = self.room_details.pop(facility_name, [])
+                residents = self.room_occupancy.pop(facility_name, [])
+
+                # Keep its overview numbers and locator entries from the records we had
+                summary = self.facility_summary[facility_name] = summarize_facility(rooms, residents)
+                self.resident_directory[facility_name] = listings_from_summary(summary)
+                self.notify("evicted", facility_name)
+                self.notify("facility_summary", facility_name)
+
+    def refresh_summaries(self, facility_names):
+        """Refetch summaries for facilities that changed while not loaded."""
+        facility_names = [f for f in facility_names if f not in self.loaded]
+        if len(facility_names) > 1:
+            self.load("facility_summary", api.fetch_facility_summaries())
+            return
+
+        for facility_name in facility_names:
+            summary = api.fetch_facility_summary(facility_name)
+            if summary is None:
+                # No summary endpoint; loading the facility recounts it
+                self.ensure_facility(facility_name)
+                continue
+            with self.lock:
+                self.facility_summary[facility_name] = summary
+                if facility_name not in self.loaded:
+                    self.resident_directory[facility_name] = listings_from_summary(summary)
+                    self.notify("resident_directory", facility_name)
+                self.notify("facility_summary", facility_name)
+
+    def refresh_facility(self, facility_name, rooms=False, occupancy=False):
+        """Scoped fallback: refetch one facility's rooms and/or residents only."""
+        if facility_name not in self.loaded:
+            self.refresh_summaries([facility_name])
+            return
+        if rooms:
+            data = api.fetch_facility_rooms(facility_name)
+            if data is not None:
+                data = rooms_from_json(data)
+                with self.lock:
+                    self.room_details[facility_name] = data
+                    self.notify("room_details", facility_name)
+        if occupancy:
+            data = api.fetch_facility_occupancy(facility_name)
+            if data is not None:
+                data = residents_from_json(data)
+                with self.lock:
+                    self.room_occupancy[facility_name] = data
+                    self.resident_directory[facility_name] = data
+                    self.notify("room_occupancy", facility_name)
+
+    def find_room(self, facility_name, room_number):
+        for room in self.room_details.get(facility_name, []):
+            if room.room == room_number:
+                return room
+        return None
+
+    def put_room(self, facility_name, room):
+        """Insert or replace one room from a server response (JSON) or a Room."""
+        if isinstance(room, dict):
+            room = Room.from_json(room)
+        rooms = self.room_details.setdefault(facility_name, [])
+        old = None
+        for i, existing in enumerate(rooms):
+            if existing.room == room.room:
+                old = existing
+                rooms[i] = room
+                break
+        else:
+            rooms.append(room)
+        self.notify("room_details", facility_name, [(old, room)])
+
+    def put_resident(self, facility_name, resident):
+        """Insert or replace one resident record from a server response."""
+        self.notify("room_occupancy", facility_name, [self.replace_resident(facility_name, resident)])
+
+    def replace_resident(self, facility_name, resident):
+        """Insert or replace a resident (JSON from a server response) without notifying; returns (old, new)."""
+        resident = Resident.from_json(resident)
+        residents = self.room_occupancy.setdefault(facility_name, [])
+        for i, existing in enumerate(residents):
+            if existing.room == resident.room and existing.resident == resident.resident:
+                residents[i] = resident
+                return existing, resident
+        residents.append(resident)
+        return None, resident
+
+    def summary_only(self, facility_name):
+        """For a facility not in memory, only its summary needs to catch up: refetch it and return True."""
+        if facility_name in self.loaded:
+            return False
+        self.refresh_summaries([facility_name])
+        return True
+
+    def apply_add_facility(self, facility_name, total_beds, result):
+        with self.lock:
+            self.facility_info[facility_name] = result.get("facility") or {"total_beds": total_beds}
+            self.notify("facility_info", facility_name, [(None, self.facility_info[facility_name])])
+            if facility_name not in self.loaded:
+                self.put_facility(facility_name, [], [])
+
+    def apply_add_room(self, facility_name, result):
+        if self.summary_only(facility_name):
+            return
+        room = result.get("room")
+        if isinstance(room, dict):
+            with self.lock:
+                self.put_room(facility_name, room)
+        else:
+            # Room type is decided by the server, so the new room has to be fetched
+            self.refresh_facility(facility_name, rooms=True)
+
+    def apply_add_resident(self, facility_name, result):
+        if self.summary_only(facility_name):
+            return
+        resident = result.get("resident")
+        room = result.get("room")
+        with self.lock:
+            if isinstance(resident, dict):
+                self.put_resident(facility_name, resident)
+            if isinstance(room, dict):
+                self.put_room(facility_name, room)
+
+        # Payment status and room status/type are computed server-side
+        self.refresh_facility(facility_name, rooms=not isinstance(room, dict), occupancy=not isinstance(resident, dict))
+
+    def apply_remove_resident(self, facility_name, room_number, resident_name, result):
+        if self.summary_only(facility_name):
+            return
+        room_number = normalize_room(room_number)
+        room = result.get("room")
+        with self.lock:
+            residents = self.room_occupancy.get(facility_name, [])
+            removed = [r for r in residents if r.room == room_number and r.resident == resident_name]
+            residents[:] = [r for r in residents if not (r.room == room_number and r.resident == resident_name)]
+            self.notify("room_occupancy", facility_name, [(r, None) for r in removed])
+
+            if isinstance(room, dict):
+                self.put_room(facility_name, room)
+                return
+
+            if not any(r.room == room_number for r in residents):
+                existing = self.find_room(facility_name, room_number)
+                if existing is not None:
+                    self.put_room(facility_name, existing.replace(status="Vacant"))
+                return
+
+        # Someone is still in the room; its new status comes from the server
+        self.refresh_facility(facility_name, rooms=True)
+
+    def apply_payment(self, payment_info, result):
+        facility_name = payment_info["facility_name"]
+        if self.summary_only(facility_name):
+            return
+        resident = result.get("resident")
+        if isinstance(resident, dict):
+            with self.lock:
+                self.put_resident(facility_name, resident)
+        else:
+            self.refresh_facility(facility_name, occupancy=True)
+
+    def apply_payments(self, payments, result):
+        """Apply a batch of payments in one step: one notification per facility touched.
+
+        Facilities whose updated records weren't in the response are refetched
+        once each, however many of their residents paid; facilities that aren't
+        loaded only have their summaries refetched.
+        """
+        changes = {}  # facility -> [(old, new)]
+        refetch = set()
+        unloaded = set()
+        with self.lock:
+            for payment_info, item in zip(payments, result.get("results", ())):
+                if "success" not in item:
+                    continue
+                facility_name = payment_info["facility_name"]
+                resident = item.get("resident")
+                if facility_name not in self.loaded:
+                    unloaded.add(facility_name)
+                elif isinstance(resident, dict):
+                    changes.setdefault(facility_name, []).append(self.replace_resident(facility_name, resident))
+                else:
+                    refetch.add(facility_name)
+            for facility_name, facility_changes in changes.items():
+                self.notify("room_occupancy", facility_name, facility_changes)
+
+        for facility_name in refetch:
+            self.refresh_facility(facility_name, occupancy=True)
+        if unloaded:
+            self.refresh_summaries(unloaded)
+
+    def apply_mutation(self, kind, payload, result):
+        """Apply a journaled mutation (see api_functions.JOURNALED_MUTATIONS) by kind."""
+        if kind == "add_resident":
+            self.apply_add_resident(payload["facility_name"], result)
+        elif kind == "remove_resident":
+            self.apply_remove_resident(payload["facility_name"], payload["room_number"], payload["resident_name"], result)
+        elif kind == "record_payment":
+            self.apply_payment(payload["payment_info"], result)
+        elif kind == "record_payments":
+            self.apply_payments(payload["payments"], result)
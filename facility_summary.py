@@ -0,0 +1,136 @@
+import threading
+
+from models import residents_from_json, rooms_from_json
+
+# Counter names, in the order the overview shows them
+ROOM_COUNTERS = ("vacant", "partial", "occupied")
+RESIDENT_COUNTERS = ("monthly_revenue", "overdue", "upcoming_due", "paid", "total_residents")
+
+ROOM_STATUS_COUNTER = {
+    "Vacant": "vacant",
+    "Partially Occupied": "partial",
+    "Occupied": "occupied",
+}
+
+PAYMENT_STATUS_COUNTER = {
+    "Overdue": "overdue",
+    "Due Within 7 Days": "upcoming_due",
+    "Paid": "paid",
+}
+
+
+def empty_counters():
+    return dict.fromkeys(ROOM_COUNTERS + RESIDENT_COUNTERS, 0)
+
+
+def add_room(counters, room, sign=1):
+    counter = ROOM_STATUS_COUNTER.get(room.status)
+    if counter:
+        counters[counter] += sign
+
+
+def add_resident(counters, resident, sign=1):
+    counters["monthly_revenue"] += sign * resident.amount
+    counters["total_residents"] += sign
+    counter = PAYMENT_STATUS_COUNTER.get(resident.status)
+    if counter:
+        counters[counter] += sign
+
+
+def summarize_facility(rooms, residents):
+    """Overview counters for one facility, plus its residents' (name, room) for the locator.
+
+    This is the shape of one entry of the get_facility_summary endpoint.
+    """
+    summary = empty_counters()
+    for room in rooms:
+        add_room(summary, room)
+    for resident in residents:
+        add_resident(summary, resident)
+    summary["residents"] = [[r.resident, r.room] for r in residents]
+    return summary
+
+
+def summarize_portfolio(room_details, room_occupancy):
+    """Summaries for every facility, from get_room_details and get_room_occupancy JSON."""
+    return {
+        facility: summarize_facility(
+            rooms_from_json(room_details.get(facility, [])), residents_from_json(room_occupancy.get(facility, []))
+        )
+        for facility in {**room_details, **room_occupancy}
+    }
+
+
+class FacilitySummary:
+    """Per-facility and portfolio-wide overview metrics.
+
+    Built in a single pass over room_details and room_occupancy, then kept
+    current through on_change(): a changed room or resident adjusts the
+    counters in O(1); a replaced facility slice is recounted for that
+    facility only. Facilities whose records aren't loaded take their
+    counters from the server-side summaries instead.
+    """
+
+    def __init__(self, room_details, room_occupancy, summaries=None):
+        self.room_details = room_details
+        self.room_occupancy = room_occupancy
+        self.summaries = summaries if summaries is not None else {}
+        self.lock = threading.Lock()
+        self.facilities = {}  # facility -> counters
+        self.totals = empty_counters()
+        self.build()
+
+    def build(self):
+        with self.lock:
+            self.facilities.clear()
+            self.totals = empty_counters()
+            for facility in set(self.room_details) | set(self.room_occupancy) | set(self.summaries):
+                self.count_facility(facility)
+
+    def count_facility(self, facility):
+        """(Re)count one facility from scratch and fold it into the portfolio totals."""
+        old = self.facilities.get(facility)
+        if old:
+            for key, value in old.items():
+                self.totals[key] -= value
+
+        counters = empty_counters()
+        if facility in self.room_details or facility in self.room_occupancy:
+            for room in self.room_details.get(facility, []):
+                add_room(counters, room)
+            for resident in self.room_occupancy.get(facility, []):
+                add_resident(counters, resident)
+        else:
+            summary = self.summaries.get(facility, {})
+            for key in counters:
+                counters[key] = summary.get(key, 0)
+
+        self.facilities[facility] = counters
+        for key, value in counters.items():
+            self.totals[key] += value
+
+    def on_change(self, dataset, facility_name=None, changes=None):
+        """Data store listener. `changes` is a list of (old, new) records, either may be None."""
+        if dataset not in ("room_details", "room_occupancy", "facility_summary"):
+            return
+        if facility_name is None:
+            self.build()
+            return
+
+        with self.lock:
+            if changes is None or dataset == "facility_summary" or facility_name not in self.facilities:
+                self.count_facility(facility_name)
+                return
+
+            add = add_room if dataset == "room_details" else add_resident
+            counters = self.facilities[facility_name]
+            for old, new in changes:
+                if old is not None:
+                    add(counters, old, -1)
+                    add(self.totals, old, -1)
+                if new is not None:
+                    add(counters, new)
+                    add(self.totals, new)
+
+    def get(self, facility_name, default=None):
+        return self.facilities.get(facility_name, default)
@@ -0,0 +1,151 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+
+# Set HAVENLEDGER_TRACE=1 to start with instrumentation on; it can also be toggled from the debug panel
+ENABLED_AT_START = os.environ.get("HAVENLEDGER_TRACE", "") not in ("", "0")
+
+# Durations kept per name for the rolling percentiles
+ROLLING_WINDOW = 500
+
+# Trace events kept for export; the oldest are dropped beyond this
+MAX_TRACE_EVENTS = 100_000
+
+PERCENTILES = (50, 90, 99)
+
+
+class NullSpan:
+    """Stand-in returned while instrumentation is off, so a disabled span costs one call."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_SPAN = NullSpan()
+
+
+class Span:
+    def __init__(self, recorder, name, category, args):
+        self.recorder = recorder
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        self.recorder.record(self.name, self.category, self.start, time.perf_counter() - self.start, **self.args)
+        return False
+
+
+class Recorder:
+    """Timings for API calls and view work: rolling percentiles plus a trace for export.
+
+    Everything is a no-op while enabled is False; callers check it (or use
+    span(), which does) before taking any timestamps.
+    """
+
+    def __init__(self, enabled=False, window=ROLLING_WINDOW, max_events=MAX_TRACE_EVENTS):
+        self.enabled = enabled
+        self.window = window
+        self.lock = threading.Lock()
+        self.durations = {}  # name -> deque of recent durations (seconds)
+        self.counts = {}  # name -> total calls since reset
+        self.events = deque(maxlen=max_events)  # (name, category, start, duration, thread id, args)
+        self.thread_names = {}
+        self.origin = time.perf_counter()
+
+    def span(self, name, category="app", **args):
+        """Context manager timing its block as one event."""
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, name, category, args)
+
+    def record(self, name, category, start, duration, **args):
+        thread = threading.current_thread()
+        with self.lock:
+            recent = self.durations.get(name)
+            if recent is None:
+                recent = self.durations[name] = deque(maxlen=self.window)
+            recent.append(duration)
+            self.counts[name] = self.counts.get(name, 0) + 1
+            self.events.append((name, category, start, duration, thread.ident, args))
+            self.thread_names[thread.ident] = thread.name
+
+    def record_phases(self, name, category, start, phases, **args):
+        """Record a call and its consecutive phases ((phase, seconds), ...) as "name [phase]"."""
+        self.record(name, category, start, sum(duration for _, duration in phases), **args)
+        for phase, duration in phases:
+            self.record(f"{name} [{phase}]", category, start, duration)
+            start += duration
+
+    def reset(self):
+        with self.lock:
+            self.durations.clear()
+            self.counts.clear()
+            self.events.clear()
+
+    def stats(self):
+        """One row per name: count, percentiles of the recent window and its max, in seconds."""
+        with self.lock:
+            snapshot = {name: sorted(recent) for name, recent in self.durations.items()}
+            counts = dict(self.counts)
+        rows = []
+        for name in sorted(snapshot):
+            recent = snapshot[name]
+            row = {"name": name, "count": counts[name]}
+            for p in PERCENTILES:
+                row[f"p{p}"] = recent[max(0, -(-len(recent) * p // 100) - 1)]  # Nearest rank
+            row["max"] = recent[-1]
+            rows.append(row)
+        return rows
+
+    def chrome_trace(self):
+        """The recorded events in Chrome's trace format (chrome://tracing, Perfetto)."""
+        pid = os.getpid()
+        with self.lock:
+            events = list(self.events)
+            thread_names = dict(self.thread_names)
+        trace = [
+            {"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+            for tid, name in thread_names.items()
+        ]
+        trace.extend(
+            {
+                "name": name, "cat": category, "ph": "X", "pid": pid, "tid": tid,
+                "ts": (start - self.origin) * 1e6, "dur": duration * 1e6, "args": args,
+            }
+            for name, category, start, duration, tid, args in events
+        )
+        return {"traceEvents": trace, "displayTimeUnit": "ms"}
+
+    def export_chrome_trace(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.chrome_trace(), f)
+
+    def export_json(self, path):
+        """Percentile summary plus every event, in seconds since the recorder started."""
+        with self.lock:
+            events = list(self.events)
+        log = {
+            "stats": self.stats(),
+            "events": [
+                {"name": name, "category": category, "start": start - self.origin, "duration": duration, "args": args}
+                for name, category, start, duration, _, args in events
+            ],
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(log, f, indent=1)
+
+
+# Shared recorder used by the API client and the views
+recorder = Recorder(ENABLED_AT_START)
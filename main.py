@@ -1,38 +1,147 @@
+import calendar
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import date, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
 import PySimpleGUI as sg
 import api_functions as api
-
-# Fetch data from API
-facility_info = api.fetch_facility_info()  # Fetch facility names + beds
-room_details = api.fetch_room_details()
-room_occupancy = api.fetch_room_occupancy()
-#print(room_occupancy) # Debugging line to check room occupancy data
+from aging import AGING_BUCKETS, FORECAST_WEEKS, OVERDUE, STATUS_COUNTERS, PaymentBook
+from bulk_import import BulkImporter
+from data_store import DataStore
+from facility_summary import FacilitySummary
+from instrumentation import recorder
+from models import residents_from_json
+from mutation_worker import DONE_EVENT, MutationWorker
+from offline_journal import MutationJournal, OfflineQueue
+from resident_search import ResidentIndex
+from room_index import RoomIndex
+from validation import validate_facility, validate_resident, validate_room
+
+STARTUP_TIME = time.perf_counter()
+
+# Data from API, filled in by load_startup_data() once the overview is on screen.
+# The store updates these dicts in place, so the module-level names stay valid.
+# Rooms and residents are only present for facilities opened recently (see load_facility).
+store = DataStore()
+facility_info = store.facility_info  # Facility names + beds
+room_details = store.room_details
+room_occupancy = store.room_occupancy
+
+# Resident locator index over every facility, loaded or not, kept in sync by the store
+resident_index = ResidentIndex(store.resident_directory)
+store.subscribe(resident_index.on_change)
+
+# Rooms and residents by (facility, room number), with precomputed room button colors
+room_index = RoomIndex(room_details, room_occupancy)
+store.subscribe(room_index.on_change)
+
+# Overview metrics, maintained incrementally as rooms, residents and payments change
+facility_summary = FacilitySummary(room_details, room_occupancy, store.facility_summary)
+store.subscribe(facility_summary.on_change)
+
+# Background queue for API mutations; results are posted back to the open window
+worker = MutationWorker()
+
+# Payments and resident changes are journaled to disk before sending and replayed after outages
+offline_queue = OfflineQueue(MutationJournal(), worker, api.send_mutation, store.apply_mutation)
+
+# Startup fetches, keyed by the store dataset each one fills in. Only summaries are
+# fetched up front; a facility's rooms and residents load when it is opened.
+STARTUP_LOADS = {
+    "facility_info": api.fetch_facility_info,
+    "facility_summary": api.fetch_facility_summaries,
+}
+pending_loads = set(STARTUP_LOADS)
+loader = ThreadPoolExecutor(max_workers=4, thread_name_prefix="load")
+loading_facilities = set()
+
+
+def load_startup_data(window):
+    """Run the startup fetches concurrently, posting each result to the window as it arrives.
+
+    Cached snapshots are posted straight away; if background revalidation finds
+    newer data on the server it is posted again as another -DATA-LOADED- event.
+    """
+    def post(name, data):
+        window.write_event_value("-DATA-LOADED-", (name, data))
+
+    def finished(name, future):
+        post(name, future.result())
+
+    for name, fetch in STARTUP_LOADS.items():
+        loader.submit(fetch, on_update=partial(post, name)).add_done_callback(partial(finished, name))
+
+
+def load_facility(window, facility_name):
+    """Fetch a facility's rooms and residents in the background, then post -FACILITY-LOADED- to the window."""
+    if facility_name in loading_facilities:
+        return
+    loading_facilities.add(facility_name)
+
+    def finished(future):
+        loading_facilities.discard(facility_name)
+        try:
+            window.write_event_value("-FACILITY-LOADED-", (facility_name, future.result()))
+        except Exception as e:
+            print(f"Error loading {facility_name}: {e}")
+
+    loader.submit(store.ensure_facility, facility_name).add_done_callback(finished)
+
+
+def set_loaded_data(name, data):
+    """Store one fetch result; returns True when it completes the startup load."""
+    # Timed as a whole: the derived indexes and overview counters rebuild here
+    with recorder.span(f"load {name}", "data"):
+        store.load(name, data)
+
+    was_pending = name in pending_loads
+    pending_loads.discard(name)
+    return was_pending and not pending_loads
+
+
+def update_worker_status(window, finished=()):
+    """Show in-progress mutations in the window's status line, or the last one saved,
+    followed by the offline backlog if there is one."""
+    text = worker.status_text()
+    if not text:
+        saved = [task.label for task in finished if task.succeeded]
+        text = f"Saved: {saved[-1]}" if saved else ""
+    backlog = offline_queue.status_text()
+    if backlog:
+        text = f"{text}  |  {backlog}" if text else backlog
+    window["-STATUS-"].update(text)
+
+
+def handle_finished_tasks(window):
+    """Report background mutations that just finished; returns them so the view can refresh."""
+    tasks = worker.take_finished()
+    for task in tasks:
+        if not task.succeeded and not task.result.get("queued"):
+            sg.popup(f"Error: {task.result.get('error', 'Unknown error')}", title=f"Failed: {task.label}")
+        elif task.succeeded:
+            if task.result.get("warning"):
+                sg.popup(task.result["warning"], title=f"Saved: {task.label}")
+            # A batch can partly succeed; say which items the server rejected
+            errors = [r.get("error", "Unknown error") for r in task.result.get("results", ()) if "success" not in r]
+            if errors:
+                sg.popup_scrolled("\n".join(errors), title=f"{len(errors)} not saved: {task.label}", size=(60, min(len(errors), 15)))
+    update_worker_status(window, tasks)
+    return tasks
 
 
 def generate_room_buttons(facility_name):
-    """Generate buttons based on room details fetched from API."""
-    room_data = []
-    if facility_name in room_details:
-        for room in room_details[facility_name]:
-            room_number = room["room"]
-            status = room["status"]
-            room_type = room["room_type"]  # Now determined dynamically
-
-            # Determine color based on status
-            if status == "Vacant":
-                color = "red"
-            elif room_type == "Semi-Private":
-                color = "yellow"
-            else:  # Private
-                color = "green"
-
-            room_label = f"Room {room_number}\n{room_type}"
-            room_data.append((room_label, color))
-
-    return room_data
+    """(room number, label, color) for each room, precomputed by the room index."""
+    with store.lock:
+        return room_index.room_buttons(facility_name)
 
 
 # Function to add a new facility
 def add_facility():
+    """GUI for adding a facility; returns True if the request was queued."""
     layout = [
         [sg.Text("Add Facility", font=("Arial", 16, "bold"), justification="center", expand_x=True)],
         [sg.Text("Facility Name:"), sg.InputText(key="-FACILITY-NAME-", size=(30, 1))],
@@ -47,34 +156,29 @@ def add_facility():
         if event in (sg.WINDOW_CLOSED, "Cancel"):
             break
         elif event == "Add Facility":
-            facility_name = values["-FACILITY-NAME-"]
-            total_beds = values["-TOTAL-BEDS-"]
-
-            if not facility_name or not total_beds.isdigit():
-                sg.popup("Please enter a valid facility name and number of beds.", title="Error")
+            facility, error = validate_facility(values["-FACILITY-NAME-"], values["-TOTAL-BEDS-"])
+            if error:
+                sg.popup(error, title="Error")
                 continue
+            facility_name, total_beds = facility["facility_name"], facility["total_beds"]
             
-            # Send data to API
-            response = api.send_add_facility(facility_name, int(total_beds))
-
-            if "error" in response:
-                sg.popup(f"Error: {response['error']}", title="Error")
-            else:
-                sg.popup("Facility added successfully!", title="Success")
-                window.close()
-                # Refresh data after adding facility
-                global room_details, room_occupancy
-                room_details = api.fetch_room_details()
-                room_occupancy = api.fetch_room_occupancy()
-
-                break
+            # Send data to API in the background
+            worker.submit(
+                f"Adding facility {facility_name}",
+                api.send_add_facility, facility_name, total_beds,
+                apply=partial(store.apply_add_facility, facility_name, total_beds),
+                succeeded=lambda response: "error" not in response
+            )
+            window.close()
+            return True
     
     window.close()
+    return False
 
 
 # Function to add a new room to a facility
 def add_room(facility_name):
-    """GUI for adding a new room to a facility"""
+    """GUI for adding a new room to a facility; returns True if the request was queued."""
     layout = [
         [sg.Text(f"Add Room to {facility_name}", font=("Arial", 16, "bold"), justification="center", expand_x=True)],
         [sg.Text("Room Number:"), sg.InputText(key="-ROOM-NUMBER-", size=(10, 1))],
@@ -88,35 +192,28 @@ def add_room(facility_name):
         if event in (sg.WINDOW_CLOSED, "Cancel"):
             break
         elif event == "Add Room":
-            room_number = values["-ROOM-NUMBER-"]
-
-            if not room_number:
-                sg.popup("Please enter a room number.", title="Error")
+            room, error = validate_room(values["-ROOM-NUMBER-"])
+            if error:
+                sg.popup(error, title="Error")
                 continue
-
-            # Send request to API
-            result = api.add_room_to_facility(facility_name, room_number)
-
-            if "success" in result:
-                sg.popup("Room added successfully!", title="Success")
-                window.close()
-
-                # ✅ Immediately refresh room details after adding a room
-                global room_details
-                room_details = api.fetch_room_details()
-
-                # ✅ Refresh facility details UI to reflect the change
-                show_facility_details(facility_name)
-                break
-            else:
-                sg.popup(f"Error: {result.get('error', 'Unknown error')}", title="Error")
+            room_number = room["room_number"]
+
+            # Send request to API in the background; only this facility's rooms are updated
+            worker.submit(
+                f"Adding Room {room_number} to {facility_name}",
+                api.add_room_to_facility, facility_name, room_number,
+                apply=partial(store.apply_add_room, facility_name)
+            )
+            window.close()
+            return True
 
     window.close()
+    return False
 
 
 # Function to add or edit room resident(s)
 def add_resident(facility_name, room_number):
-    """GUI for adding a resident to a room."""
+    """GUI for adding a resident to a room; returns True if the request was queued."""
     layout = [
         [sg.Text(f"Add Resident to Room {room_number}", font=("Arial", 16, "bold"), justification="center", expand_x=True)],
         [sg.Text("Resident Name:"), sg.InputText(key="-RESIDENT-NAME-", size=(30, 1))],
@@ -133,45 +230,32 @@ def add_resident(facility_name, room_number):
         if event in (sg.WINDOW_CLOSED, "Cancel"):
             break
         elif event == "Add Resident":
-            resident_name = values["-RESIDENT-NAME-"]
-            monthly_payment = values["-MONTHLY-PAYMENT-"].replace(",", "")  # Remove commas
-            payment_due_date = values["-PAYMENT-DUE-DATE-"]
-            move_in_date = values["-MOVE-IN-DATE-"]
-
-            if not resident_name or not monthly_payment or not payment_due_date or not move_in_date:
-                sg.popup("Please fill in all fields.", title="Error")
+            resident, error = validate_resident(
+                values["-RESIDENT-NAME-"], values["-MONTHLY-PAYMENT-"], values["-PAYMENT-DUE-DATE-"], values["-MOVE-IN-DATE-"]
+            )
+            if error:
+                sg.popup(error, title="Error")
                 continue
 
-            try:
-                monthly_payment = float(monthly_payment)  # Convert to a valid number
-            except ValueError:
-                sg.popup("Invalid payment amount. Please enter a valid number.", title="Error")
-                continue
-
-            # Call API function to add resident
-            result = api.add_resident_to_room(facility_name, room_number, resident_name, monthly_payment, payment_due_date, move_in_date)
-
-            if "success" in result:
-                sg.popup("Resident added successfully!", title="Success")
-                window.close()
+            # Journal the new resident, then send it in the background
+            offline_queue.submit(
+                f"Adding {resident['resident_name']} to Room {room_number}", "add_resident",
+                dict(resident, facility_name=facility_name, room_number=room_number)
+            )
+            window.close()
+            return True
+    window.close()
+    return False
 
-                # ✅ Immediately refresh data after adding a resident
-                global room_occupancy
-                room_occupancy = api.fetch_room_occupancy()
 
-                # ✅ Refresh room details UI to reflect the change
-                show_room_details(facility_name, room_number)
-                break
-            else:
-                sg.popup(f"Error: {result.get('error', 'Unknown error')}", title="Error")
-    window.close()
+def due_date_for(due_day, today):
+    """This month's due date for a due day, clamped to the month's length."""
+    return date(today.year, today.month, min(due_day, calendar.monthrange(today.year, today.month)[1]))
 
 
 def record_payment_window(facility_name, room_number, resident_name, expected_due_day):
-    from datetime import date
-
     today = date.today()
-    default_due_date = date(today.year, today.month, min(expected_due_day, 28))  # Avoid invalid dates
+    default_due_date = due_date_for(expected_due_day, today)  # Avoid invalid dates
 
     layout = [
         [sg.Text(f"Record Payment for {resident_name}", font=("Arial", 16, "bold"), justification="center", expand_x=True)],
@@ -213,286 +297,1091 @@ def record_payment_window(facility_name, room_number, resident_name, expected_du
     return None  # In case user cancels
 
 
-def show_room_details(facility_name, room_number):
-    # Fetch resident details from room_occupancy
-    residents = [
-        [r["resident"], f"${r['amount']:,}", r["date"], r["status"]]
-        for r in room_occupancy.get(facility_name, []) if r["room"] == room_number
-    ]
+# Which residents the batch payment window lists, by payment status
+BATCH_FILTERS = {
+    "Unpaid": lambda r: r.status != "Paid",
+    "Overdue": lambda r: r.status == "Overdue",
+    "Due Within 7 Days": lambda r: r.status == "Due Within 7 Days",
+    "All Residents": lambda r: True,
+}
+
+
+def batch_payment_residents(occupancy, status_filter):
+    """(facility, resident record) pairs from an occupancy dict, in overview order."""
+    keep = BATCH_FILTERS[status_filter]
+    with store.lock:
+        return [(f, r) for f in facility_info if f in occupancy for r in occupancy[f] if keep(r)]
+
+
+def portfolio_occupancy():
+    """Every facility's residents, or None if the server couldn't be reached.
+
+    Most facilities aren't loaded, so this is one portfolio fetch (loaded
+    records are fresher). Blocks on the network, so call it off the GUI
+    thread. Only data the server just sent (or confirmed) is used, never a
+    stale snapshot or just the loaded facilities, so totals over it are complete.
+    """
+    fetched = api.fetch_room_occupancy(current_only=True)
+    if fetched is None:
+        return None
+    fetched = {f: residents_from_json(residents) for f, residents in fetched.items()}
+    with store.lock:
+        # Copies, since workers keep updating the loaded facilities' lists
+        return {**fetched, **{f: list(residents) for f, residents in room_occupancy.items()}}
 
-    # Handle case where the room has no residents (Vacant)
-    if not residents:
-        residents = [["No Residents", "-", "-", "-"]]
 
+def load_portfolio_occupancy(window):
+    """Run portfolio_occupancy() on the loader, then post -PORTFOLIO-LOADED- with its result to the window."""
+    def finished(future):
+        try:
+            window.write_event_value("-PORTFOLIO-LOADED-", future.result())
+        except Exception as e:
+            print(f"Error loading residents: {e}")
+
+    loader.submit(portfolio_occupancy).add_done_callback(finished)
+
+
+PORTFOLIO_UNAVAILABLE = "Could not load every facility's residents from the server. Please try again when it is reachable."
+
+
+def batch_payments_window(facility_name=None):
+    """Marks many residents as paid at once, for one facility or the whole portfolio.
+
+    Each resident's due date is prefilled from their due day. The payments go to
+    the server as one journaled batch and are applied to the store together.
+    Returns True if a batch was queued.
+    """
+    today = date.today()
+    status_filter = "Unpaid"
+    if facility_name:
+        occupancy = {facility_name: room_occupancy.get(facility_name, [])}
+    else:
+        occupancy = {}  # Filled in by -PORTFOLIO-LOADED-
+    residents = batch_payment_residents(occupancy, status_filter)
+
+    def table_rows():
+        return [
+            [f, r.room, r.resident, f"${r.amount:,}", r.status, due_date_for(r.due_day, today).isoformat()]
+            for f, r in residents
+        ]
+
+    title = f"Batch Payments - {facility_name}" if facility_name else "Batch Payments - All Facilities"
     layout = [
-        [sg.Text(f"Room {room_number} Details", font=("Arial", 16, "bold"), justification="center", expand_x=True)],
-        [sg.Text("Resident(s)", font=("Arial", 14, "bold"))],
+        [sg.Text(title, font=("Arial", 16, "bold"), justification="center", expand_x=True)],
+        [sg.Text("Show:"), sg.Combo(list(BATCH_FILTERS), default_value=status_filter, key="-BATCH-FILTER-", readonly=True, enable_events=True, size=(18, 1)),
+         sg.Button("Select All", size=(12, 1)), sg.Button("Clear Selection", size=(14, 1)),
+         sg.Text("", key="-BATCH-COUNT-", size=(25, 1))],
         [sg.Table(
-            values=residents,
-            headings=["Resident Name", "Monthly Payment", "Payment Due Date", "Status"],
+            values=table_rows(),
+            headings=["Facility", "Room #", "Resident Name", "Amount Due", "Status", "Due Date (applies to)"],
             auto_size_columns=False,
             justification='center',
-            col_widths=[20, 15, 15, 10],
-            key="-RESIDENT-TABLE-",
-            num_rows=min(len(residents), 5),  # Adjust based on number of residents
+            col_widths=[18, 8, 20, 12, 16, 18],
+            key="-BATCH-TABLE-",
+            select_mode=sg.TABLE_SELECT_MODE_EXTENDED,
             enable_events=True,
+            num_rows=15,
         )],
-        [
-            sg.Button("Add Resident", size=(18, 1)),
-            sg.Button("Edit Resident", size=(18, 1)),
-            sg.Button("Remove Resident", size=(18, 1)),
-            sg.Button("Mark as Paid", size=(18, 1)),  # Updated for real data
-            sg.Button("Back", size=(18, 1))
-        ]
+        [sg.Text("Payment Date (actual paid):"), sg.Input(today.isoformat(), key="-PAYMENT-DATE-", size=(15, 1)), sg.CalendarButton("📅", target="-PAYMENT-DATE-", format="%Y-%m-%d")],
+        [sg.Text("Payment Method:"), sg.Combo(["Cash", "Check", "Debit/Credit"], key="-METHOD-", readonly=True, size=(20, 1))],
+        [sg.Text("Notes (optional):"), sg.InputText(key="-NOTES-", size=(30, 1))],
+        [sg.Button("Record Payments", size=(20, 1)), sg.Button("Cancel", size=(15, 1))]
     ]
 
-    window = sg.Window(f"Room {room_number} Details", layout, finalize=True)
+    window = sg.Window(title, layout, finalize=True)
+
+    def show_selection(selected):
+        total = sum(residents[i][1].amount for i in selected)
+        window["-BATCH-COUNT-"].update(f"{len(selected)} selected (${total:,})")
 
+    if facility_name:
+        show_selection([])
+    else:
+        window["-BATCH-COUNT-"].update("Loading residents...")
+        load_portfolio_occupancy(window)
     while True:
         event, values = window.read()
-
-        if event in (sg.WINDOW_CLOSED, "Back"):
-            window.close()
+        if event in (sg.WINDOW_CLOSED, "Cancel"):
             break
+        elif event == "-PORTFOLIO-LOADED-":
+            if values[event] is None:
+                sg.popup(PORTFOLIO_UNAVAILABLE, title="Residents not loaded")
+                break
+            occupancy = values[event]
+            residents = batch_payment_residents(occupancy, status_filter)
+            window["-BATCH-TABLE-"].update(values=table_rows())
+            show_selection([])
+        elif event == "-BATCH-FILTER-":
+            status_filter = values["-BATCH-FILTER-"]
+            residents = batch_payment_residents(occupancy, status_filter)
+            window["-BATCH-TABLE-"].update(values=table_rows())
+            show_selection([])
+        elif event == "Select All":
+            window["-BATCH-TABLE-"].update(select_rows=list(range(len(residents))))
+            show_selection(range(len(residents)))
+        elif event == "Clear Selection":
+            window["-BATCH-TABLE-"].update(select_rows=[])
+            show_selection([])
+        elif event == "-BATCH-TABLE-":
+            show_selection(values["-BATCH-TABLE-"])
+        elif event == "Record Payments":
+            selected = values["-BATCH-TABLE-"]
+            payment_date = values["-PAYMENT-DATE-"]
+            method = values["-METHOD-"]
+            notes = values["-NOTES-"]
 
-        elif event == "Add Resident":
+            if not selected:
+                sg.popup("Please select at least one resident.", title="No selection")
+                continue
+            if not payment_date or not method:
+                sg.popup("Please fill out all required fields (Payment Date, Method).", title="Missing Info")
+                continue
+
+            payments = [
+                {
+                    "facility_name": f,
+                    "room_number": r.room,
+                    "resident_name": r.resident,
+                    "payment_due_date": due_date_for(r.due_day, today).isoformat(),
+                    "payment_date": payment_date,
+                    "method": method,
+                    "notes": notes
+                }
+                for f, r in (residents[i] for i in selected)
+            ]
+            offline_queue.submit(f"{len(payments)} payment{'s' if len(payments) != 1 else ''}", "record_payments", {"payments": payments})
             window.close()
-            add_resident(facility_name, room_number)
-            show_room_details(facility_name, room_number)  # Refresh the view
-            break
+            return True
 
-        elif event == "Mark as Paid":
-            selected = values["-RESIDENT-TABLE-"]
-            if not selected or residents[selected[0]][0] == "No Residents":
-                sg.popup("Please select a valid resident.", title="No selection")
-            else:
-                row_index = selected[0]
-                resident_name = residents[row_index][0]
+    window.close()
+    return False
 
-                # Find the expected due day for that resident
-                expected_due_day = int(residents[row_index][2]) if residents[row_index][2].isdigit() else 1
 
-                # Open payment input window
-                payment_info = record_payment_window(facility_name, room_number, resident_name, expected_due_day)
-                print(payment_info)  # Debugging line to check payment info
+OVERDUE_LIST_LIMIT = 100
 
-                if payment_info:
-                    result = api.record_payment(payment_info)
 
-                    # sg.popup(f"Payment recorded for {resident_name}.", title="Success")
-                    if "success" in result:
-                        sg.popup(f"Payment recorded for {resident_name}.", title="Success")
+def money(amount):
+    return f"${amount:,.0f}"
 
-                        # # Refresh room occupancy
-                        # global room_occupancy
-                        # room_occupancy = api.fetch_room_occupancy()
 
-                        window.close()
-                        show_room_details(facility_name, room_number)
-                        break
-                    else:
-                        sg.popup(f"Error: {result.get('error', 'Unknown error')}", title="Error")
+def aging_rows(book, aging):
+    """Aging table rows: the portfolio total, then each facility in overview order."""
+    by_facility = book.facility_rows(aging)
+    counts = list(STATUS_COUNTERS.values())
+    amounts = list(AGING_BUCKETS[1:]) + ["past_due"]
+    totals = {column: sum(row[column] for row in by_facility.values()) for column in counts + amounts}
 
-                    # # Refresh room occupancy
-                    # global room_occupancy
-                    # room_occupancy = api.fetch_room_occupancy()
+    def row(name, values):
+        return [name] + [values[c] for c in counts] + [money(values[c]) for c in amounts]
 
-                    window.close()
-                    show_room_details(facility_name, room_number)
-                    break
-        
-        elif event == "Remove Resident":
-            selected = values["-RESIDENT-TABLE-"]
-            if not selected or residents[selected[0]][0] == "No Residents":
-                sg.popup("Please select a valid resident to remove.", title="No selection")
-            else:
-                row_index = selected[0]
-                resident_name = residents[row_index][0]
+    with store.lock:
+        facilities = [f for f in facility_info if f in by_facility]
+    return [row("All Facilities", totals)] + [row(f, by_facility[f]) for f in facilities]
 
-                confirm = sg.popup_yes_no(f"Are you sure you want to remove {resident_name}?", title="Confirm Removal")
-                if confirm == "Yes":
-                    result = api.remove_resident_from_room(facility_name, room_number, resident_name)
 
-                    if "success" in result:
-                        sg.popup(f"{resident_name} removed successfully.", title="Success")
-                        
-                        # Refresh room occupancy and view
-                        # global room_occupancy
-                        # room_occupancy = api.fetch_room_occupancy()
+def forecast_rows(book, aging):
+    rows = [["Past due now", money(aging.amount_due.sum()), int((aging.status == OVERDUE).sum())]]
+    for week_start, amount, count in book.forecast(aging.as_of):
+        rows.append([f"Week of {week_start.isoformat()}", money(amount), count])
+    return rows
 
-                        window.close()
-                        show_room_details(facility_name, room_number)  # Reload updated UI
-                        break
-                    else:
-                        sg.popup(f"Error: {result.get('error', 'Unknown error')}", title="Error")
 
-    window.close()
+def overdue_rows(book, aging):
+    facilities = book.facilities
+    return [
+        [facilities[book.facility[i]], book.residents[i].room, book.residents[i].resident, days, money(amount)]
+        for i, days, amount in book.overdue(aging, limit=OVERDUE_LIST_LIMIT)
+    ]
 
 
-def show_facility_details(facility_name):
-    """Displays the facility details window, including rooms and residents"""
-    room_data = generate_room_buttons(facility_name)  # ✅ Fetch updated rooms
-    payment_data = room_occupancy.get(facility_name, [])
-    payment_table_data = [[p["room"], p["resident"], p["amount"], p["status"], p["date"]] for p in payment_data]
+def aging_window():
+    """Payment status, aging buckets and upcoming charges for the whole portfolio, as of any date.
+
+    Residents are loaded once, in the background; changing the date only
+    reruns the payment engine (aging.py) over them, so the tables follow the
+    date instantly.
+    """
+    book = PaymentBook({})  # Replaced by -PORTFOLIO-LOADED-
+    as_of = date.today()
+    aging = book.evaluate(as_of)
 
     layout = [
-        [sg.Text(f"{facility_name} - Room Overview", font=("Arial", 16, "bold"))],
-        [sg.Column([
-            [sg.Button(name, key=f"ROOM-{name}", size=(12, 3), button_color=("black", color), font=("Arial", 10, "bold")) 
-             for name, color in room_data[i:i+5]]
-            for i in range(0, len(room_data), 5)
-        ])],
-        [
-            sg.Text("Legend:"),
-            sg.Text("Red = Vacant"),
-            sg.Text("Yellow = Occupied (Semi-Private)"),
-            sg.Text("Green = Occupied (Private)")
-        ],
-        [sg.Text("Resident Payments", font=("Arial", 14, "bold"))],
+        [sg.Text("Aging & Cash Forecast", font=("Arial", 16, "bold"), justification="center", expand_x=True)],
+        [sg.Text("As of:"), sg.Input(as_of.isoformat(), key="-AS-OF-", size=(15, 1), enable_events=True),
+         sg.CalendarButton("📅", target="-AS-OF-", format="%Y-%m-%d"),
+         sg.Button("◀ 7 Days", key="-EARLIER-"), sg.Button("Today"), sg.Button("7 Days ▶", key="-LATER-"),
+         sg.Text("Loading residents...", key="-AS-OF-STATUS-", size=(30, 1))],
+        [sg.Table(
+            values=aging_rows(book, aging),
+            headings=["Facility", "Paid", "Due Within 7 Days", "Overdue", "1-30 Days", "31-60 Days", "61-90 Days", "90+ Days", "Past Due"],
+            auto_size_columns=False,
+            justification='center',
+            col_widths=[20, 6, 14, 8, 11, 11, 11, 11, 12],
+            key="-AGING-TABLE-",
+            num_rows=10,
+        )],
+        [sg.Text("Cash Forecast", font=("Arial", 14, "bold"))],
         [sg.Table(
-            values=payment_table_data,
-            headings=["Room #", "Resident Name", "Amount Due", "Payment Status", "Payment Date"],
+            values=forecast_rows(book, aging),
+            headings=["Period", "Amount", "Residents"],
             auto_size_columns=False,
             justification='center',
-            col_widths=[10, 20, 15, 15, 10],
-            key="-PAYMENT-TABLE-",
-            num_rows=min(len(payment_table_data), 10),
+            col_widths=[22, 14, 10],
+            key="-FORECAST-TABLE-",
+            num_rows=FORECAST_WEEKS + 1,
         )],
-        [sg.Button("Add Room", key="ADD_ROOM"), sg.Button("Back", key="BACK")]
+        [sg.Text(f"Overdue Residents (longest first, up to {OVERDUE_LIST_LIMIT})", font=("Arial", 14, "bold"))],
+        [sg.Table(
+            values=overdue_rows(book, aging),
+            headings=["Facility", "Room #", "Resident Name", "Days Past Due", "Amount Due"],
+            auto_size_columns=False,
+            justification='center',
+            col_widths=[20, 8, 20, 12, 12],
+            key="-OVERDUE-TABLE-",
+            num_rows=10,
+        )],
+        [sg.Button("Close", size=(15, 1))]
     ]
 
-    window = sg.Window(f"{facility_name} - Details", layout, finalize=True)
+    window = sg.Window("Aging & Cash Forecast", layout, finalize=True)
+    load_portfolio_occupancy(window)
     while True:
         event, values = window.read()
-        if event in (sg.WINDOW_CLOSED, "BACK"):
-            window.close()
-            break
-        elif event == "ADD_ROOM":
-            window.close()
-            add_room(facility_name)
-            show_facility_details(facility_name)  # ✅ Reload facility details to show new room
-            break
-        elif event.startswith("ROOM-"):
-            room_number = [int(s) for s in event.split() if s.isdigit()][0]
-            window.close()
-            show_room_details(facility_name, room_number)
-            show_facility_details(facility_name)  # ✅ Reload after viewing room details
+        if event in (sg.WINDOW_CLOSED, "Close"):
             break
+
+        if event == "-PORTFOLIO-LOADED-":
+            if values[event] is None:
+                sg.popup(PORTFOLIO_UNAVAILABLE, title="Residents not loaded")
+                break
+            book = PaymentBook(values[event])
+            new_date = as_of
+        elif event == "-AS-OF-":
+            try:
+                new_date = date.fromisoformat(values["-AS-OF-"].strip())
+            except ValueError:
+                window["-AS-OF-STATUS-"].update("Enter a date as YYYY-MM-DD")
+                continue
+        elif event == "Today":
+            new_date = date.today()
+        elif event in ("-EARLIER-", "-LATER-"):
+            new_date = as_of + timedelta(days=-7 if event == "-EARLIER-" else 7)
+        else:
+            continue
+
+        as_of = new_date
+        aging = book.evaluate(as_of)
+        window["-AS-OF-"].update(as_of.isoformat())
+        window["-AS-OF-STATUS-"].update("")
+        window["-AGING-TABLE-"].update(values=aging_rows(book, aging))
+        window["-FORECAST-TABLE-"].update(values=forecast_rows(book, aging))
+        window["-OVERDUE-TABLE-"].update(values=overdue_rows(book, aging))
     window.close()
 
-def show_facility_overview():
-    # Dynamically compute facility summary
-    facility_summary = {}
-
-    for facility, rooms in room_details.items():
-        total_vacant = sum(1 for r in rooms if r["status"] == "Vacant")
-        total_partial = sum(1 for r in rooms if r["status"] == "Partially Occupied")
-        total_occupied = sum(1 for r in rooms if r["status"] == "Occupied")
-
-        payments = room_occupancy.get(facility, [])
-
-        total_revenue = sum(r["amount"] for r in payments)
-        overdue_count = sum(1 for r in payments if r["status"] == "Overdue")
-        upcoming_due_count = sum(1 for r in payments if r["status"] == "Due Within 7 Days")
-        paid_count = sum(1 for r in payments if r["status"] == "Paid")
-        total_residents = len(payments)
-
-        facility_summary[facility] = {
-            "vacant": total_vacant,
-            "partial": total_partial,
-            "occupied": total_occupied,
-            "monthly_revenue": total_revenue,
-            "overdue": overdue_count,
-            "upcoming_due": upcoming_due_count,
-            "paid": paid_count,
-            "total_residents": total_residents
-        }
 
+NO_RESIDENTS_ROWS = [["No Residents", "-", "-", "-"]]
+
+
+def room_resident_rows(facility_name, room_number):
+    # Cached by the room index until the facility's residents change
+    with store.lock:
+        residents = room_index.resident_rows(facility_name, room_number)
+
+    # Handle case where the room has no residents (Vacant)
+    if not residents:
+        residents = NO_RESIDENTS_ROWS
+    return residents
+
+
+def show_sync_backlog():
+    """Lists journaled changes still waiting to reach the server."""
+    def backlog_rows():
+        return [
+            [time.strftime("%Y-%m-%d %H:%M", time.localtime(e.created_at)), e.label, e.attempts, e.last_error or "-"]
+            for e in offline_queue.backlog()
+        ]
+
+    rows = backlog_rows()
     layout = [
-        [sg.Text("HavenLedger - Facility Overview", font=("Arial", 16, "bold"))],
-        [sg.Text(f"Total Monthly Revenue Across Facilities: ${sum(f['monthly_revenue'] for f in facility_summary.values()):,}", font=("Arial", 14, "bold"))],
-        [sg.Text("Resident Locator:"), sg.InputText(key="-RESIDENT-SEARCH-", size=(30, 1)), sg.Button("Search")],
-        # [sg.Table(
-        #     values=[
-        #         [
-        #             fac,
-        #             facility_summary[fac]["vacant"],
-        #             f"${facility_summary[fac]['monthly_revenue']:,}",
-        #             facility_summary[fac]["overdue"],
-        #             facility_summary[fac]["upcoming_due"],
-        #             facility_summary[fac]["paid"],
-        #             facility_summary[fac]["total_residents"],
-        #             facility_info.get(fac, {}).get("total_beds", "N/A")
-        #         ]
-        #         for fac in facility_info.keys()
-        #     ],
-        #     headings=["Facility Name", "Vacant", "Monthly Revenue", "Overdue", "Due Within 7 Days", "Paid", "Residents", "Total Beds"],
-        #     auto_size_columns=False,
-        #     justification='center',
-        #     col_widths=[20, 10, 15, 10, 18, 10, 10, 10],
-        #     key="-FACILITY-TABLE-",
-        #     enable_events=True,
-        #     num_rows=10
-        # )],
-            [sg.Table(
-            values=[
-                [
-                    fac,
-                    facility_summary[fac]["total_residents"],
-                    facility_summary[fac]["vacant"],
-                    f"${facility_summary[fac]['monthly_revenue']:,}",
-                    facility_summary[fac]["overdue"],
-                    facility_summary[fac]["upcoming_due"],
-                    facility_summary[fac]["paid"],
-                    facility_info.get(fac, {}).get("total_beds", "N/A")
-                ]
-                for fac in facility_info.keys()
-            ],
-            headings=["Facility Name", "Residents", "Vacant", "Monthly Revenue", "Overdue", "Due Within 7 Days", "Paid", "Total Beds"],
+        [sg.Text("Changes Waiting to Sync", font=("Arial", 16, "bold"), justification="center", expand_x=True)],
+        [sg.Table(
+            values=rows,
+            headings=["Recorded", "Change", "Attempts", "Last Error"],
             auto_size_columns=False,
             justification='center',
-            col_widths=[20, 10, 10, 15, 10, 18, 10, 10],
-            key="-FACILITY-TABLE-",
-            enable_events=True,
-            num_rows=10
+            col_widths=[16, 30, 8, 30],
+            key="-BACKLOG-TABLE-",
+            num_rows=10,
         )],
+        [sg.Button("Retry Now", size=(15, 1)), sg.Button("Refresh", size=(15, 1)), sg.Button("Close", size=(15, 1))]
+    ]
+
+    window = sg.Window("Pending Changes", layout, finalize=True)
+    while True:
+        event, values = window.read()
+        if event in (sg.WINDOW_CLOSED, "Close"):
+            break
+        elif event == "Retry Now":
+            offline_queue.retry_now()
+        elif event == "Refresh":
+            window["-BACKLOG-TABLE-"].update(values=backlog_rows())
+    window.close()
+
 
-        [sg.Button("View Facility Details", size=(20, 1)), sg.Button("Add Facility", size=(15, 1)), sg.Button("Exit", size=(15, 1))]
+def apply_import_results(importer, results):
+    """Bring the store up to date after an import: one scoped refresh per touched facility
+    that is loaded, and one summary refresh for the rest."""
+    beds = {row.facility_name: cleaned["total_beds"] for row, cleaned in importer.valid if row.row_type == "facility"}
+    touched = set()
+    for result in results:
+        if not result.ok or result.skipped:
+            continue
+        if result.row_type == "facility":
+            store.apply_add_facility(result.facility_name, beds[result.facility_name], {})
+        else:
+            touched.add(result.facility_name)
+    for facility_name in touched:
+        if store.is_loaded(facility_name):
+            store.refresh_facility(facility_name, rooms=True, occupancy=True)
+    store.refresh_summaries(touched)
+
+
+def show_bulk_import():
+    """Imports facilities, rooms and residents from a CSV or JSON file.
+
+    Returns True if anything was imported, so the caller can refresh its views.
+    """
+    layout = [
+        [sg.Text("Bulk Import", font=("Arial", 16, "bold"), justification="center", expand_x=True)],
+        [sg.Text("File (CSV or JSON):"), sg.Input(key="-IMPORT-FILE-", size=(40, 1)),
+         sg.FileBrowse(file_types=(("CSV / JSON", "*.csv *.json"),)), sg.Button("Load", size=(8, 1))],
+        [sg.Text("Columns: type (facility/room/resident), facility_name, total_beds, room_number, "
+                 "resident_name, monthly_payment, payment_due_date, move_in_date", size=(80, 2))],
+        [sg.ProgressBar(1, orientation="h", size=(50, 20), key="-IMPORT-PROGRESS-"), sg.Text("", key="-IMPORT-COUNT-", size=(20, 1))],
+        [sg.Table(
+            values=[],
+            headings=["Line", "Type", "Facility", "Result"],
+            auto_size_columns=False,
+            justification='center',
+            col_widths=[6, 10, 20, 45],
+            key="-IMPORT-RESULTS-",
+            num_rows=10,
+        )],
+        [sg.Button("Import", size=(15, 1), disabled=True), sg.Button("Cancel Import", size=(15, 1), disabled=True), sg.Button("Close", size=(15, 1))]
     ]
 
-    window = sg.Window("HavenLedger - Facility Overview", layout, finalize=True)
+    window = sg.Window("Bulk Import", layout, finalize=True)
+    importer = None
+    problems = []  # RowResults for rows that failed validation or submission
+    imported = False
+
     while True:
         event, values = window.read()
-        if event in (sg.WINDOW_CLOSED, "Exit"):
-            window.close()
+        if event in (sg.WINDOW_CLOSED, "Close"):
+            if importer:
+                importer.cancel()
             break
+
+        elif event == "Load":
+            path = values["-IMPORT-FILE-"].strip()
+            if not path:
+                sg.popup("Choose a file to import first.", title="No file")
+                continue
+            try:
+                importer = BulkImporter(path)
+            except (OSError, ValueError) as e:
+                importer = None
+                sg.popup(f"Could not read {path}: {e}", title="Error")
+                window["Import"].update(disabled=True)
+                continue
+
+            problems = list(importer.errors)
+            remaining = len(importer.remaining())
+            already = len(importer.valid) - remaining
+            window["-IMPORT-RESULTS-"].update(values=[[r.line, r.row_type, r.facility_name, r.message] for r in problems])
+            window["-IMPORT-PROGRESS-"].update(current_count=0, max=max(remaining, 1))
+            window["-IMPORT-COUNT-"].update(
+                f"{remaining} to import" + (f", {already} already done" if already else "")
+            )
+            window["Import"].update(disabled=not remaining)
+
+        elif event == "Import":
+            window["Import"].update(disabled=True)
+            window["Load"].update(disabled=True)
+            window["Cancel Import"].update(disabled=False)
+
+            def post(event, value):
+                try:
+                    window.write_event_value(event, value)
+                except Exception:
+                    # Closed mid-import; the rows already sent are still applied below
+                    pass
+
+            def run_import(importer=importer):
+                results = importer.run(on_progress=lambda done, total, result: post("-IMPORT-ROW-", (done, total, result)))
+                apply_import_results(importer, results)
+                post("-IMPORT-DONE-", results)
+
+            threading.Thread(target=run_import, name="bulk-import", daemon=True).start()
+
+        elif event == "Cancel Import":
+            importer.cancel()
+
+        elif event == "-IMPORT-ROW-":
+            done, total, result = values[event]
+            window["-IMPORT-PROGRESS-"].update(current_count=done, max=max(total, 1))
+            window["-IMPORT-COUNT-"].update(f"{done} of {total}")
+            if not result.ok:
+                problems.append(result)
+                window["-IMPORT-RESULTS-"].update(values=[[r.line, r.row_type, r.facility_name, r.message] for r in problems])
+
+        elif event == "-IMPORT-DONE-":
+            results = values[event]
+            succeeded = sum(1 for r in results if r.ok)
+            imported = imported or succeeded > 0
+            window["Cancel Import"].update(disabled=True)
+            window["Load"].update(disabled=False)
+            window["Import"].update(disabled=not importer.remaining())
+            sg.popup(
+                f"Imported {succeeded} of {len(results)} rows."
+                + ("\nFix the failed rows and import the same file again to resume." if succeeded < len(results) else ""),
+                title="Import Finished"
+            )
+
+    window.close()
+    return imported
+
+
+def performance_rows():
+    return [
+        [row["name"], row["count"], *(f"{row[key] * 1000:.1f}" for key in ("p50", "p90", "p99", "max"))]
+        for row in recorder.stats()
+    ]
+
+
+def show_performance_panel():
+    """Debug panel: rolling latency percentiles for API calls, data loads and views."""
+    def toggle_text():
+        return "Disable Timing" if recorder.enabled else "Enable Timing"
+
+    layout = [
+        [sg.Text("Performance", font=("Arial", 16, "bold"), justification="center", expand_x=True)],
+        [sg.Text("API calls are split into [connect], [server], [download] and [decode]. Times in ms over the last "
+                 "calls of each kind.", size=(90, 2))],
+        [sg.Table(
+            values=performance_rows(),
+            headings=["Timing", "Count", "p50", "p90", "p99", "Max"],
+            auto_size_columns=False,
+            justification='center',
+            col_widths=[40, 8, 9, 9, 9, 9],
+            key="-PERF-TABLE-",
+            num_rows=18,
+        )],
+        [sg.Button(toggle_text(), key="-PERF-TOGGLE-", size=(15, 1)), sg.Button("Refresh", size=(10, 1)), sg.Button("Reset", size=(10, 1)),
+         sg.Input(key="-TRACE-FILE-", visible=False, enable_events=True),
+         sg.FileSaveAs("Export Chrome Trace", target="-TRACE-FILE-", file_types=(("Trace", "*.json"),), default_extension=".json"),
+         sg.Input(key="-LOG-FILE-", visible=False, enable_events=True),
+         sg.FileSaveAs("Export JSON Log", target="-LOG-FILE-", file_types=(("JSON", "*.json"),), default_extension=".json"),
+         sg.Button("Close", size=(10, 1))]
+    ]
+
+    window = sg.Window("Performance", layout, finalize=True)
+    while True:
+        event, values = window.read(timeout=2000)
+        if event in (sg.WINDOW_CLOSED, "Close"):
+            break
+        elif event == "-PERF-TOGGLE-":
+            recorder.enabled = not recorder.enabled
+            window["-PERF-TOGGLE-"].update(toggle_text())
+        elif event == "Reset":
+            recorder.reset()
+        elif event in ("-TRACE-FILE-", "-LOG-FILE-") and values[event]:
+            try:
+                if event == "-TRACE-FILE-":
+                    recorder.export_chrome_trace(values[event])
+                else:
+                    recorder.export_json(values[event])
+            except OSError as e:
+                sg.popup(f"Could not write {values[event]}: {e}", title="Error")
+                continue
+            sg.popup(f"Saved to {values[event]}", title="Exported")
+        window["-PERF-TABLE-"].update(values=performance_rows())  # Also refreshes on the read timeout
+    window.close()
+
+
+def facility_payment_rows(facility_name):
+    # Cached by the room index until the facility's residents change
+    with store.lock:
+        return room_index.payment_rows(facility_name)
+
+
+SEARCH_PREVIEW_LIMIT = 20
+
+EMPTY_SUMMARY = {"vacant": "-", "monthly_revenue": 0, "overdue": "-", "upcoming_due": "-", "paid": "-", "total_residents": "-"}
+
+
+def facility_table_rows():
+    """Overview table rows; facilities whose rooms haven't loaded yet show placeholders."""
+    rows = []
+    with store.lock:
+        for fac in facility_info.keys():
+            summary = facility_summary.get(fac, EMPTY_SUMMARY)
+            rows.append([
+                fac,
+                summary["total_residents"],
+                summary["vacant"],
+                f"${summary['monthly_revenue']:,}",
+                summary["overdue"],
+                summary["upcoming_due"],
+                summary["paid"],
+                facility_info.get(fac, {}).get("total_beds", "N/A")
+            ])
+    return rows
+
+
+def revenue_text():
+    if pending_loads:
+        return "Loading facility data..."
+    return f"Total Monthly Revenue Across Facilities: ${facility_summary.totals['monthly_revenue']:,}"
+
+
+# Hidden views kept alive for quick return; the least recently used beyond this are closed
+MAX_CACHED_VIEWS = 8
+
+
+class View(ABC):
+    """A window kept alive by the Navigator and refreshed in place with Element.update."""
+
+    def __init__(self, nav):
+        self.nav = nav
+        self.window = None
+        self.stale = False
+        self.rendered = {}  # element key -> last values pushed to it
+
+    def create(self):
+        self.rendered.clear()
+        name = type(self).__name__
+        with recorder.span(f"{name} layout", "view"):
+            layout = self.layout()
+        with recorder.span(f"{name} window", "view"):
+            self.window = sg.Window(self.title(), layout, finalize=True)
+
+    def render(self):
+        """refresh(), timed."""
+        with recorder.span(f"{type(self).__name__} refresh", "view"):
+            self.refresh()
+
+    @abstractmethod
+    def title(self):
+        """The window title."""
+
+    @abstractmethod
+    def layout(self):
+        """A fresh PySimpleGUI layout for the window (elements can't be reused across windows)."""
+
+    def refresh(self):
+        """Bring the window up to date with the store; only changed elements are touched."""
+        self.stale = False
+
+    def showing(self):
+        """Called each time the navigator brings this view (back) to the front."""
+        if self.stale:
+            self.render()
+
+    def update_table(self, key, rows):
+        if self.rendered.get(key) != rows:
+            self.window[key].update(values=rows)
+            self.rendered[key] = rows
+
+    def update_text(self, key, text):
+        if self.rendered.get(key) != text:
+            self.window[key].update(text)
+            self.rendered[key] = text
+
+    def handle(self, event, values):
+        pass
+
+    def close(self):
+        if self.window is not None:
+            self.window.close()
+            self.window = None
+
+
+class FacilityDataView(View):
+    """A view of one facility's rooms and residents, which are fetched when first needed."""
+
+    def create(self):
+        super().create()
+        self.ensure_loaded()
+
+    def ensure_loaded(self):
+        if not store.is_loaded(self.facility_name):
+            load_facility(self.window, self.facility_name)
+
+    def showing(self):
+        store.touch(self.facility_name)
+        if not store.is_loaded(self.facility_name):
+            # Evicted while this view was hidden
+            self.ensure_loaded()
+            self.render()
+        else:
+            super().showing()
+
+    def facility_loaded(self, loaded):
+        if not loaded:
+            sg.popup(f"Could not load {self.facility_name}. Please check your connection and try again.", title="Error")
+        self.nav.data_changed()
+
+
+class RoomView(FacilityDataView):
+    def __init__(self, nav, facility_name, room_number):
+        super().__init__(nav)
+        self.facility_name = facility_name
+        self.room_number = room_number
+        self.residents = room_resident_rows(facility_name, room_number)
+
+    def title(self):
+        return f"Room {self.room_number} Details"
+
+    def layout(self):
+        self.rendered["-RESIDENT-TABLE-"] = self.residents
+        return [
+            [sg.Text(f"Room {self.room_number} Details", font=("Arial", 16, "bold"), justification="center", expand_x=True)],
+            [sg.Text("Resident(s)", font=("Arial", 14, "bold"))],
+            [sg.Table(
+                values=self.residents,
+                headings=["Resident Name", "Monthly Payment", "Payment Due Date", "Status"],
+                auto_size_columns=False,
+                justification='center',
+                col_widths=[20, 15, 15, 10],
+                key="-RESIDENT-TABLE-",
+                num_rows=5,
+                enable_events=True,
+            )],
+            [
+                sg.Button("Add Resident", size=(18, 1)),
+                sg.Button("Edit Resident", size=(18, 1)),
+                sg.Button("Remove Resident", size=(18, 1)),
+                sg.Button("Mark as Paid", size=(18, 1)),  # Updated for real data
+                sg.Button("Back", size=(18, 1))
+            ],
+            [sg.Text("", key="-STATUS-", size=(60, 1))]
+        ]
+
+    def refresh(self):
+        super().refresh()
+        self.residents = room_resident_rows(self.facility_name, self.room_number)
+        self.update_table("-RESIDENT-TABLE-", self.residents)
+
+    def selected_resident(self, values, message):
+        selected = values["-RESIDENT-TABLE-"]
+        if not selected or self.residents[selected[0]][0] == "No Residents":
+            sg.popup(message, title="No selection")
+            return None
+        return self.residents[selected[0]]
+
+    def handle(self, event, values):
+        facility_name, room_number = self.facility_name, self.room_number
+
+        if event == "Back":
+            self.nav.back()
+
+        elif event == "-FACILITY-LOADED-":
+            self.facility_loaded(values[event][1])
+
+        elif event == "Add Resident":
+            if add_resident(facility_name, room_number):
+                update_worker_status(self.window)
+
+        elif event == "Mark as Paid":
+            resident = self.selected_resident(values, "Please select a valid resident.")
+            if resident:
+                resident_name = resident[0]
+
+                # Find the expected due day for that resident
+                expected_due_day = int(resident[2]) if resident[2].isdigit() else 1
+
+                # Open payment input window
+                payment_info = record_payment_window(facility_name, room_number, resident_name, expected_due_day)
+
+                if payment_info:
+                    offline_queue.submit(f"Payment for {resident_name}", "record_payment", {"payment_info": payment_info})
+                    update_worker_status(self.window)
+
+        elif event == "Remove Resident":
+            resident = self.selected_resident(values, "Please select a valid resident to remove.")
+            if resident:
+                resident_name = resident[0]
+
+                confirm = sg.popup_yes_no(f"Are you sure you want to remove {resident_name}?", title="Confirm Removal")
+                if confirm == "Yes":
+                    offline_queue.submit(f"Removing {resident_name}", "remove_resident", {
+                        "facility_name": facility_name,
+                        "room_number": room_number,
+                        "resident_name": resident_name
+                    })
+                    update_worker_status(self.window)
+
+
+# Room grid size; only this many room buttons exist per facility window, reused across pages
+GRID_COLUMNS = 5
+GRID_ROWS = 4
+GRID_SIZE = GRID_COLUMNS * GRID_ROWS
+
+# Room grid filters, by the button color each one selects (see the legend)
+ROOM_FILTERS = {
+    "All Rooms": None,
+    "Vacant": "red",
+    "Semi-Private": "yellow",
+    "Private": "green",
+}
+EMPTY_SLOT = ("", ("black", "gray85"))
+
+
+class FacilityView(FacilityDataView):
+    """Displays the facility details window, including rooms and residents.
+
+    The room grid is a fixed set of GRID_SIZE buttons paged over the (filtered)
+    rooms, so opening a facility costs the same however many rooms it has.
+    """
+
+    def __init__(self, nav, facility_name):
+        super().__init__(nav)
+        self.facility_name = facility_name
+        self.room_data = generate_room_buttons(facility_name)  # ✅ Fetch updated rooms
+        self.room_filter = "All Rooms"
+        self.page = 0
+        self.slot_rooms = [None] * GRID_SIZE  # room number shown in each grid slot
+
+    def title(self):
+        return f"{self.facility_name} - Details"
+
+    def filtered_rooms(self):
+        color = ROOM_FILTERS[self.room_filter]
+        return [room for room in self.room_data if color is None or room[2] == color]
+
+    def page_count(self, rooms):
+        return max(1, -(-len(rooms) // GRID_SIZE))
+
+    def page_slots(self):
+        """(room number, label, button color) for every grid slot on the current page."""
+        if not store.is_loaded(self.facility_name):
+            return [(None, *EMPTY_SLOT)] * GRID_SIZE, "Loading rooms..."
+        rooms = self.filtered_rooms()
+        self.page = min(self.page, self.page_count(rooms) - 1)
+        page_rooms = rooms[self.page * GRID_SIZE:(self.page + 1) * GRID_SIZE]
+        slots = [(room_number, label, ("black", color)) for room_number, label, color in page_rooms]
+        slots += [(None, *EMPTY_SLOT)] * (GRID_SIZE - len(slots))
+        return slots, f"Page {self.page + 1} of {self.page_count(rooms)} ({len(rooms)} room{'s' if len(rooms) != 1 else ''})"
+
+    def layout(self):
+        payment_table_data = facility_payment_rows(self.facility_name)
+        self.rendered["-PAYMENT-TABLE-"] = payment_table_data
+        slots, page_text = self.page_slots()
+        self.slot_rooms = [room_number for room_number, _, _ in slots]
+        self.rendered["-PAGE-"] = page_text
+        for i, slot in enumerate(slots):
+            self.rendered[("SLOT", i)] = slot
+
+        return [
+            [sg.Text(f"{self.facility_name} - Room Overview", font=("Arial", 16, "bold"))],
+            [
+                sg.Text("Show:"),
+                sg.Combo(list(ROOM_FILTERS), default_value=self.room_filter, key="-ROOM-FILTER-", readonly=True, enable_events=True, size=(15, 1)),
+                sg.Button("◀ Prev", key="-PREV-"),
+                sg.Text(page_text, key="-PAGE-", size=(28, 1), justification="center"),
+                sg.Button("Next ▶", key="-NEXT-")
+            ],
+            [sg.Column([
+                [sg.Button(label, key=("SLOT", i), size=(12, 3), button_color=color, font=("Arial", 10, "bold"), disabled=room_number is None)
+                 for i, (room_number, label, color) in enumerate(slots[row:row + GRID_COLUMNS], start=row)]
+                for row in range(0, GRID_SIZE, GRID_COLUMNS)
+            ])],
+            [
+                sg.Text("Legend:"),
+                sg.Text("Red = Vacant"),
+                sg.Text("Yellow = Occupied (Semi-Private)"),
+                sg.Text("Green = Occupied (Private)")
+            ],
+            [sg.Text("Resident Payments", font=("Arial", 14, "bold"))],
+            [sg.Table(
+                values=payment_table_data,
+                headings=["Room #", "Resident Name", "Amount Due", "Payment Status", "Payment Date"],
+                auto_size_columns=False,
+                justification='center',
+                col_widths=[10, 20, 15, 15, 10],
+                key="-PAYMENT-TABLE-",
+                num_rows=10,
+            )],
+            [sg.Button("Add Room", key="ADD_ROOM"), sg.Button("Batch Payments", key="BATCH_PAYMENTS"), sg.Button("Back", key="BACK")],
+            [sg.Text("", key="-STATUS-", size=(60, 1))]
+        ]
+
+    def render_grid(self):
+        """Point the grid's buttons at the current page, updating only slots that changed."""
+        slots, page_text = self.page_slots()
+        for i, slot in enumerate(slots):
+            if self.rendered.get(("SLOT", i)) != slot:
+                room_number, label, color = slot
+                self.window[("SLOT", i)].update(text=label, button_color=color, disabled=room_number is None)
+                self.rendered[("SLOT", i)] = slot
+        self.slot_rooms = [room_number for room_number, _, _ in slots]
+        self.update_text("-PAGE-", page_text)
+
+    def refresh(self):
+        super().refresh()
+        self.room_data = generate_room_buttons(self.facility_name)
+        self.render_grid()
+        self.update_table("-PAYMENT-TABLE-", facility_payment_rows(self.facility_name))
+
+    def handle(self, event, values):
+        if event == "BACK":
+            self.nav.back()
+        elif event == "-FACILITY-LOADED-":
+            self.facility_loaded(values[event][1])
+        elif event == "ADD_ROOM":
+            if add_room(self.facility_name):
+                update_worker_status(self.window)
+        elif event == "BATCH_PAYMENTS":
+            if batch_payments_window(self.facility_name):
+                update_worker_status(self.window)
+        elif event == "-ROOM-FILTER-":
+            self.room_filter = values["-ROOM-FILTER-"]
+            self.page = 0
+            self.render_grid()
+        elif event in ("-PREV-", "-NEXT-"):
+            step = -1 if event == "-PREV-" else 1
+            self.page = max(0, min(self.page + step, self.page_count(self.filtered_rooms()) - 1))
+            self.render_grid()
+        elif isinstance(event, tuple) and event[0] == "SLOT":
+            room_number = self.slot_rooms[event[1]]
+            if room_number is not None:
+                self.nav.open(RoomView, self.facility_name, room_number)
+
+
+class OverviewView(View):
+    def title(self):
+        return "HavenLedger - Facility Overview"
+
+    def layout(self):
+        loading = bool(pending_loads)
+        self.rendered["-FACILITY-TABLE-"] = facility_table_rows()
+        self.rendered["-TOTAL-REVENUE-"] = revenue_text()
+        return [
+            [sg.Text("HavenLedger - Facility Overview", font=("Arial", 16, "bold"))],
+            [sg.Text(self.rendered["-TOTAL-REVENUE-"], key="-TOTAL-REVENUE-", font=("Arial", 14, "bold"))],
+            [sg.Text("Resident Locator:"), sg.InputText(key="-RESIDENT-SEARCH-", size=(30, 1), enable_events=True), sg.Button("Search")],
+            [sg.Table(
+                values=[],
+                headings=["Resident Name", "Facility", "Room #"],
+                auto_size_columns=False,
+                justification='center',
+                col_widths=[25, 20, 10],
+                key="-SEARCH-RESULTS-",
+                num_rows=4,
+            )],
+            # [sg.Table(
+            #     values=[
+            #         [
+            #             fac,
+            #             facility_summary[fac]["vacant"],
+            #             f"${facility_summary[fac]['monthly_revenue']:,}",
+            #             facility_summary[fac]["overdue"],
+            #             facility_summary[fac]["upcoming_due"],
+            #             facility_summary[fac]["paid"],
+            #             facility_summary[fac]["total_residents"],
+            #             facility_info.get(fac, {}).get("total_beds", "N/A")
+            #         ]
+            #         for fac in facility_info.keys()
+            #     ],
+            #     headings=["Facility Name", "Vacant", "Monthly Revenue", "Overdue", "Due Within 7 Days", "Paid", "Residents", "Total Beds"],
+            #     auto_size_columns=False,
+            #     justification='center',
+            #     col_widths=[20, 10, 15, 10, 18, 10, 10, 10],
+            #     key="-FACILITY-TABLE-",
+            #     enable_events=True,
+            #     num_rows=10
+            # )],
+                [sg.Table(
+                values=self.rendered["-FACILITY-TABLE-"],
+                headings=["Facility Name", "Residents", "Vacant", "Monthly Revenue", "Overdue", "Due Within 7 Days", "Paid", "Total Beds"],
+                auto_size_columns=False,
+                justification='center',
+                col_widths=[20, 10, 10, 15, 10, 18, 10, 10],
+                key="-FACILITY-TABLE-",
+                enable_events=True,
+                num_rows=10
+            )],
+
+            [sg.Button("View Facility Details", size=(20, 1), disabled=loading), sg.Button("Add Facility", size=(15, 1), disabled=loading), sg.Button("Bulk Import", size=(15, 1), disabled=loading), sg.Button("Batch Payments", size=(15, 1), disabled=loading), sg.Button("Aging", size=(10, 1), disabled=loading), sg.Button("Pending Changes", size=(15, 1)), sg.Button("Performance", size=(12, 1)), sg.Button("Exit", size=(15, 1))],
+            [sg.Text("", key="-STATUS-", size=(60, 1))]
+        ]
+
+    def create(self):
+        super().create()
+        if pending_loads:
+            load_startup_data(self.window)
+
+    def refresh(self):
+        super().refresh()
+        self.update_table("-FACILITY-TABLE-", facility_table_rows())
+        self.update_text("-TOTAL-REVENUE-", revenue_text())
+
+    def handle(self, event, values):
+        window = self.window
+        if event == "Exit":
+            self.nav.exit()
+        elif event == "-DATA-LOADED-":
+            name, data = values[event]
+            startup_complete = set_loaded_data(name, data)
+
+            # Fill in whatever the new data makes available
+            self.nav.data_changed()
+
+            if startup_complete:
+                elapsed = time.perf_counter() - STARTUP_TIME
+                print(f"Startup data loaded in {elapsed:.2f}s")
+                window["-STATUS-"].update(f"Data loaded in {elapsed:.2f}s")
+                window["View Facility Details"].update(disabled=False)
+                window["Add Facility"].update(disabled=False)
+                window["Bulk Import"].update(disabled=False)
+                window["Batch Payments"].update(disabled=False)
+                window["Aging"].update(disabled=False)
+        elif event == "-RESIDENT-SEARCH-":
+            # Live results as the user types
+            matches = resident_index.search(values["-RESIDENT-SEARCH-"], limit=SEARCH_PREVIEW_LIMIT)
+            window["-SEARCH-RESULTS-"].update(values=[[m.name, m.facility, m.room] for m in matches])
         elif event == "Search":
             resident_name = values["-RESIDENT-SEARCH-"].strip()
-            found = None
-            for facility, residents in room_occupancy.items():
-                for res in residents:
-                    if res["resident"].lower() == resident_name.lower():
-                        found = (facility, res["room"])
-                        break
-                if found:
-                    break
-            if found:
-                sg.popup(f"{resident_name} is in {found[0]}, Room {found[1]}", title="Resident Found")
+            matches = resident_index.search(resident_name, limit=None)
+            if matches:
+                found = "\n".join(f"{m.name} is in {m.facility}, Room {m.room}" for m in matches)
+                sg.popup_scrolled(found, title=f"Residents Found ({len(matches)})", size=(60, min(len(matches), 15)))
             else:
                 sg.popup(f"{resident_name} not found in the system.", title="Resident Not Found")
         elif event == "View Facility Details":
             selected_rows = values["-FACILITY-TABLE-"]
             if selected_rows:
-                selected_facility = list(facility_info.keys())[selected_rows[0]]
-                window.close()
-                show_facility_details(selected_facility)
-                show_facility_overview()
+                with store.lock:
+                    selected_facility = list(facility_info.keys())[selected_rows[0]]
+                self.nav.open(FacilityView, selected_facility)
         elif event == "Add Facility":
-            window.close()
-            add_facility()
-            show_facility_overview()
-            break
-    window.close()
+            if add_facility():
+                update_worker_status(window)
+        elif event == "Bulk Import":
+            if show_bulk_import():
+                self.nav.data_changed()
+        elif event == "Batch Payments":
+            if batch_payments_window():
+                update_worker_status(window)
+        elif event == "Aging":
+            aging_window()
+        elif event == "Pending Changes":
+            show_sync_backlog()
+            update_worker_status(window)
+        elif event == "Performance":
+            show_performance_panel()
+
+
+class Navigator:
+    """Single event loop over every open view.
+
+    Navigating pushes or pops views on a stack and hides/un-hides their windows,
+    so the call stack stays flat however long the session runs. Hidden views are
+    kept for quick return (up to MAX_CACHED_VIEWS) and refreshed in place when
+    they come back, if data changed while they were hidden.
+    """
+
+    def __init__(self, max_cached=MAX_CACHED_VIEWS):
+        self.max_cached = max_cached
+        self.stack = []
+        self.views = OrderedDict()  # view key -> view, least recently shown first
+        self.running = False
+
+    def open(self, view_class, *args):
+        key = (view_class.__name__, *args)
+        view = self.views.pop(key, None)
+        if view is None:
+            view = view_class(self, *args)
+            view.create()
+        else:
+            view.showing()
+            view.window.un_hide()
+        self.views[key] = view
+
+        if self.stack:
+            self.stack[-1].window.hide()
+        self.stack.append(view)
+        update_worker_status(view.window)
+        self.evict()
+        return view
+
+    def back(self):
+        self.stack.pop().window.hide()
+        if not self.stack:
+            self.exit()
+            return
+        self.show(self.stack[-1])
+
+    def show(self, view):
+        view.showing()
+        view.window.un_hide()
+        update_worker_status(view.window)
+
+    def evict(self):
+        hidden = [key for key, view in self.views.items() if view not in self.stack]
+        for key in hidden[:max(0, len(self.views) - self.max_cached)]:
+            self.views.pop(key).close()
+
+    def data_changed(self):
+        """Refresh the visible view now; hidden ones refresh when shown again."""
+        for view in self.views.values():
+            view.stale = True
+        if self.stack:
+            self.stack[-1].render()
+
+    def exit(self):
+        self.running = False
+
+    def find(self, window):
+        for view in self.views.values():
+            if view.window is window:
+                return view
+        return None
+
+    def run(self, view_class):
+        root = self.open(view_class)
+        # The root view lives for the whole session, so background results always have a window to reach
+        worker.attach(root.window)
+        self.running = True
+
+        while self.running:
+            window, event, values = sg.read_all_windows()
+            view = self.find(window)
+            if view is None:
+                continue
+
+            if event == sg.WINDOW_CLOSED:
+                if view is root:
+                    break
+                # Closing a window with its X button works like Back
+                view.window = None
+                self.views = OrderedDict((k, v) for k, v in self.views.items() if v is not view)
+                if view in self.stack:
+                    self.stack.remove(view)
+                    self.show(self.stack[-1])
+            elif event == DONE_EVENT:
+                handle_finished_tasks(self.stack[-1].window)
+                self.data_changed()
+            else:
+                view.handle(event, values)
+
+        worker.detach(root.window)
+        for view in self.views.values():
+            view.close()
+
 
-# Start the program with the overview
-show_facility_overview()
+if __name__ == "__main__":
+    # Start the program with the overview, replaying any changes left over from an outage
+    offline_queue.start()
+    Navigator().run(OverviewView)
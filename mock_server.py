@@ -0,0 +1,346 @@
+"""Local stand-in for the HavenLedger API, for development and benchmarks.
+
+Serves a synthetic portfolio under /api with the same endpoints and response
+shapes api_functions expects (including the get_facility_summary overview
+endpoint), plus configurable latency. Run it with
+
+    python mock_server.py --facilities 100 --latency 0.05
+
+and point the client at it with api.configure_client("http://127.0.0.1:5000/api").
+"""
+import argparse
+import calendar
+import hashlib
+import json
+import random
+import ssl
+import threading
+import time
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from facility_summary import summarize_portfolio
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 5000
+
+# Synthetic portfolio shape
+ROOMS_PER_FACILITY = (10, 60)
+PRIVATE_SHARE = 0.6  # The rest are semi-private (two beds)
+VACANCY_RATE = 0.12
+MONTHLY_PAYMENTS = (2500, 7500)
+
+FIRST_NAMES = [
+    "Ann", "Bo", "Carlos", "Dana", "Eli", "Fatima", "George", "Hana", "Ivan", "Jose", "Kim", "Luis",
+    "Maria", "Nadia", "Omar", "Priya", "Quinn", "Rosa", "Sam", "Tariq", "Uma", "Victor", "Wei", "Yusuf",
+]
+LAST_NAMES = [
+    "Lee", "Kim", "Garcia", "Smith", "Nguyen", "Patel", "Johnson", "Brown", "Lopez", "Chen", "Ali",
+    "Davis", "Martinez", "Wilson", "Khan", "Moore", "Taylor", "Anderson", "Thomas", "Jackson",
+]
+
+
+def payment_status(due_day, paid, today=None):
+    """Status as the overview shows it: Paid, Overdue, Due Within 7 Days or Pending."""
+    if paid:
+        return "Paid"
+    today = today or date.today()
+    if due_day <= today.day:
+        return "Overdue"
+    if due_day - today.day <= 7:
+        return "Due Within 7 Days"
+    return "Pending"
+
+
+def due_date(due_day, months_back=0, today=None):
+    """A due date (YYYY-MM-DD) some months before this one, clamped to the month's length."""
+    today = today or date.today()
+    year, month = divmod(today.year * 12 + today.month - 1 - months_back, 12)
+    return date(year, month + 1, min(due_day, calendar.monthrange(year, month + 1)[1])).isoformat()
+
+
+def room_status(residents, room_type):
+    if not residents:
+        return "Vacant"
+    if room_type == "Semi-Private" and len(residents) < 2:
+        return "Partially Occupied"
+    return "Occupied"
+
+
+def generate_portfolio(facilities, rooms_per_facility=ROOMS_PER_FACILITY, seed=0):
+    """A reproducible portfolio in the API's shape: (facility_info, room_details, room_occupancy)."""
+    rng = random.Random(seed)
+    facility_info, room_details, room_occupancy = {}, {}, {}
+
+    for i in range(1, facilities + 1):
+        facility_name = f"Facility {i:03d}"
+        rooms, residents = [], []
+        for room_number in range(101, 101 + rng.randint(*rooms_per_facility)):
+            room_type = "Private" if rng.random() < PRIVATE_SHARE else "Semi-Private"
+            beds = 1 if room_type == "Private" else 2
+            occupants = 0 if rng.random() < VACANCY_RATE else rng.randint(1, beds)
+            in_room = []
+            for _ in range(occupants):
+                due_day = rng.choice((1, 1, 1, 5, 10, 15))
+                paid = rng.random() < 0.7
+                # Some unpaid residents are a few months behind, for aging
+                months_behind = 0 if paid else rng.choice((1, 1, 1, 2, 3, 5))
+                in_room.append({
+                    "room": room_number,
+                    "resident": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+                    "amount": rng.randrange(*MONTHLY_PAYMENTS, 50),
+                    "date": str(due_day),
+                    "status": "Overdue" if months_behind > 1 else payment_status(due_day, paid),
+                    "paid_through": due_date(due_day, months_behind),
+                })
+            rooms.append({"room": room_number, "status": room_status(in_room, room_type), "room_type": room_type})
+            residents.extend(in_room)
+
+        facility_info[facility_name] = {"total_beds": sum(1 if r["room_type"] == "Private" else 2 for r in rooms)}
+        room_details[facility_name] = rooms
+        room_occupancy[facility_name] = residents
+
+    return facility_info, room_details, room_occupancy
+
+
+class MockBackend:
+    """In-memory API state. Each dataset has a version that doubles as its ETag."""
+
+    def __init__(self, facilities=10, seed=0, latency=0.0, jitter=0.0):
+        self.facility_info, self.room_details, self.room_occupancy = generate_portfolio(facilities, seed=seed)
+        self.latency = latency
+        self.jitter = jitter
+        self.lock = threading.Lock()
+        self.versions = dict.fromkeys(("get_facilities", "get_room_details", "get_room_occupancy", "get_facility_summary"), 1)
+        self.idempotent = {}  # Idempotency-Key -> earlier response
+
+    def delay(self):
+        if self.latency or self.jitter:
+            time.sleep(self.latency + random.uniform(0, self.jitter))
+
+    def changed(self, *endpoints):
+        for endpoint in endpoints + ("get_facility_summary",):
+            self.versions[endpoint] += 1
+
+    def etag(self, endpoint, facility_name=None):
+        return '"' + hashlib.sha1(f"{endpoint}:{self.versions[endpoint]}:{facility_name}".encode()).hexdigest()[:16] + '"'
+
+    def get(self, endpoint, facility_name=None):
+        """(status, body, etag) for a GET endpoint."""
+        if endpoint not in self.versions:
+            return 404, {"error": f"Unknown endpoint {endpoint}"}, None
+        with self.lock:
+            if endpoint == "get_facilities":
+                data = self.facility_info
+            else:
+                rooms, residents = self.room_details, self.room_occupancy
+                if facility_name:
+                    rooms = {facility_name: rooms.get(facility_name, [])}
+                    residents = {facility_name: residents.get(facility_name, [])}
+                if endpoint == "get_room_details":
+                    data = rooms
+                elif endpoint == "get_room_occupancy":
+                    data = residents
+                else:
+                    data = summarize_portfolio(rooms, residents)
+            return 200, json.loads(json.dumps(data)), self.etag(endpoint, facility_name)
+
+    def post(self, endpoint, body, idempotency_key=None):
+        """(status, body) for a POST endpoint, replaying the first answer for a repeated key."""
+        handler = getattr(self, f"do_{endpoint}", None)
+        if handler is None:
+            return 404, {"error": f"Unknown endpoint {endpoint}"}
+        with self.lock:
+            if idempotency_key and idempotency_key in self.idempotent:
+                return self.idempotent[idempotency_key]
+            try:
+                response = handler(body)
+            except (KeyError, TypeError, ValueError) as e:
+                response = 400, {"error": f"Bad request: {e}"}
+            if idempotency_key:
+                self.idempotent[idempotency_key] = response
+            return response
+
+    def find_room(self, facility_name, room_number):
+        for room in self.room_details.get(facility_name, []):
+            if room["room"] == room_number:
+                return room
+        return None
+
+    def update_room_status(self, facility_name, room):
+        in_room = [r for r in self.room_occupancy[facility_name] if r["room"] == room["room"]]
+        room["status"] = room_status(in_room, room["room_type"])
+
+    def do_add_facility(self, body):
+        facility_name = body["facility_name"]
+        if facility_name in self.facility_info:
+            return 400, {"error": f"Facility {facility_name} already exists"}
+        self.facility_info[facility_name] = {"total_beds": int(body["total_beds"])}
+        self.room_details[facility_name] = []
+        self.room_occupancy[facility_name] = []
+        self.changed("get_facilities", "get_room_details", "get_room_occupancy")
+        return 200, {"message": f"Facility {facility_name} added", "facility": self.facility_info[facility_name]}
+
+    def do_add_room(self, body):
+        facility_name, room_number = body["facility_name"], int(body["room_number"])
+        if facility_name not in self.room_details:
+            return 404, {"error": f"Facility {facility_name} not found"}
+        if self.find_room(facility_name, room_number):
+            return 400, {"error": f"Room {room_number} already exists"}
+        room = {"room": room_number, "status": "Vacant", "room_type": "Private"}
+        self.room_details[facility_name].append(room)
+        self.changed("get_room_details")
+        return 200, {"success": f"Room {room_number} added", "room": room}
+
+    def do_add_resident(self, body):
+        facility_name, room_number = body["facility_name"], int(body["room_number"])
+        room = self.find_room(facility_name, room_number)
+        if room is None:
+            return 404, {"error": f"Room {room_number} not found in {facility_name}"}
+        due_day = int(body["payment_due_date"])
+        resident = {
+            "room": room_number,
+            "resident": body["resident_name"],
+            "amount": int(float(body["monthly_payment"])),
+            "date": str(due_day),
+            "status": payment_status(due_day, False),
+            "paid_through": due_date(due_day, 1),
+        }
+        self.room_occupancy[facility_name].append(resident)
+        self.update_room_status(facility_name, room)
+        self.changed("get_room_details", "get_room_occupancy")
+        return 200, {"success": f"{resident['resident']} added", "resident": resident, "room": room}
+
+    def do_remove_resident(self, body):
+        facility_name, room_number, name = body["facility_name"], int(body["room_number"]), body["resident_name"]
+        residents = self.room_occupancy.get(facility_name, [])
+        remaining = [r for r in residents if not (r["room"] == room_number and r["resident"] == name)]
+        if len(remaining) == len(residents):
+            return 404, {"error": f"{name} not found in Room {room_number}"}
+        residents[:] = remaining
+        room = self.find_room(facility_name, room_number)
+        self.update_room_status(facility_name, room)
+        self.changed("get_room_details", "get_room_occupancy")
+        return 200, {"success": f"{name} removed", "room": room}
+
+    def do_record_payment(self, body):
+        facility_name, room_number, name = body["facility_name"], int(body["room_number"]), body["resident_name"]
+        for resident in self.room_occupancy.get(facility_name, []):
+            if resident["room"] == room_number and resident["resident"] == name:
+                resident["status"] = "Paid"
+                resident["paid_through"] = max(resident["paid_through"], body.get("payment_due_date") or "")
+                self.changed("get_room_occupancy")
+                return 200, {"success": f"Payment recorded for {name}", "resident": resident}
+        return 404, {"error": f"{name} not found in Room {room_number}"}
+
+    def do_record_payments(self, body):
+        results = [self.do_record_payment(payment)[1] for payment in body["payments"]]
+        return 200, {"success": f"Recorded {sum('success' in r for r in results)} payments", "results": results}
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, like the production server
+    disable_nagle_algorithm = True  # Otherwise small responses wait on delayed ACKs
+    backend = None  # Set by make_server()
+
+    def endpoint(self):
+        url = urlparse(self.path)
+        if not url.path.startswith("/api/"):
+            return None, {}
+        return url.path[len("/api/"):].strip("/"), parse_qs(url.query)
+
+    def send_json(self, status, body, etag=None):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        if etag:
+            self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        self.backend.delay()
+        endpoint, query = self.endpoint()
+        facility_name = query.get("facility_name", [None])[0]
+        status, body, etag = self.backend.get(endpoint, facility_name)
+        if etag and self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_json(status, body, etag)
+
+    def do_POST(self):
+        self.backend.delay()
+        endpoint, _ = self.endpoint()
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        except ValueError:
+            self.send_json(400, {"error": "Invalid JSON"})
+            return
+        status, response = self.backend.post(endpoint, body, self.headers.get("Idempotency-Key"))
+        self.send_json(status, response)
+
+    def log_message(self, format, *args):
+        pass  # Quiet; benchmarks would otherwise be timing the console
+
+
+def make_server(backend, host=DEFAULT_HOST, port=DEFAULT_PORT, certfile=None, keyfile=None):
+    """An HTTP server for the backend; port 0 picks a free port (see server.server_port).
+
+    With a certificate (and its key, if not in the same file) it serves HTTPS.
+    """
+    handler = type("BoundHandler", (Handler,), {"backend": backend})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    if certfile:
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(certfile, keyfile)
+        server.socket = context.wrap_socket(server.socket, server_side=True)
+    return server
+
+
+def base_url(server, host):
+    scheme = "https" if isinstance(server.socket, ssl.SSLSocket) else "http"
+    return f"{scheme}://{host}:{server.server_port}/api"
+
+
+def start_in_background(backend, host=DEFAULT_HOST, port=0, certfile=None, keyfile=None):
+    """Serve on a daemon thread; returns (server, base URL for api.configure_client)."""
+    server = make_server(backend, host, port, certfile, keyfile)
+    threading.Thread(target=server.serve_forever, name="mock-server", daemon=True).start()
+    return server, base_url(server, host)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a synthetic HavenLedger portfolio locally.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--facilities", type=int, default=10, help="Portfolio size (1-500)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every request")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random delay, up to this many seconds")
+    parser.add_argument("--certfile", help="Serve HTTPS with this certificate (PEM)")
+    parser.add_argument("--keyfile", help="Private key for --certfile, if not in the same file")
+    args = parser.parse_args()
+
+    if not 1 <= args.facilities <= 500:
+        parser.error("--facilities must be between 1 and 500")
+
+    backend = MockBackend(args.facilities, args.seed, args.latency, args.jitter)
+    server = make_server(backend, args.host, args.port, args.certfile, args.keyfile)
+    residents = sum(len(r) for r in backend.room_occupancy.values())
+    print(f"Serving {args.facilities} facilities ({residents} residents) on {base_url(server, args.host)}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+import sys
+
+# In-memory records for rooms and residents.
+#
+# API responses are converted once, when the data store takes them in; views
+# and indexes read attributes from here instead of the raw JSON dicts. Each
+# record uses __slots__, and the few distinct status, room type and due day
+# strings are interned so the whole portfolio shares one copy of each.
+
+
+def normalize_room(room_number):
+    """Room numbers come back from the API as ints but are typed into the GUI as strings."""
+    if isinstance(room_number, str) and room_number.strip().isdigit():
+        return int(room_number.strip())
+    return room_number
+
+
+def intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class Record:
+    __slots__ = ()
+
+    def replace(self, **changes):
+        """A copy with some fields changed."""
+        return type(self)(**dict(self.to_json(), **changes))
+
+    def to_json(self):
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    def __eq__(self, other):
+        return type(other) is type(self) and all(getattr(self, f) == getattr(other, f) for f in self.__slots__)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"{type(self).__name__}({', '.join(f'{f}={getattr(self, f)!r}' for f in self.__slots__)})"
+
+
+class Room(Record):
+    """One room of get_room_details."""
+
+    __slots__ = ("room", "status", "room_type")
+
+    def __init__(self, room, status, room_type):
+        self.room = normalize_room(room)
+        self.status = intern(status)
+        self.room_type = intern(room_type)
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(data["room"], data["status"], data["room_type"])
+
+
+class Resident(Record):
+    """One resident of get_room_occupancy. `date` is the due day of the month.
+
+    paid_through is the last due date (YYYY-MM-DD) their payments cover, when
+    the server sends it.
+    """
+
+    __slots__ = ("room", "resident", "amount", "date", "status", "paid_through")
+
+    def __init__(self, room, resident, amount, date, status, paid_through=None):
+        self.room = normalize_room(room)
+        self.resident = resident
+        self.amount = amount
+        self.date = intern(date)
+        self.status = intern(status)
+        self.paid_through = paid_through
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(data["room"], data["resident"], data["amount"], data["date"], data["status"], data.get("paid_through"))
+
+    @property
+    def due_day(self):
+        """Day of the month the payment falls due (1 if the API didn't say)."""
+        due_day = str(self.date)
+        return int(due_day) if due_day.isdigit() else 1
+
+    def payment_row(self):
+        """Row of a facility's payment table."""
+        return [self.room, self.resident, self.amount, self.status, self.date]
+
+    def room_row(self):
+        """Row of a room's resident table."""
+        return [self.resident, f"${self.amount:,}", self.date, self.status]
+
+
+class Listing(Record):
+    """Where a resident lives, from a facility summary (facilities whose records aren't loaded)."""
+
+    __slots__ = ("resident", "room")
+
+    def __init__(self, resident, room):
+        self.resident = resident
+        self.room = normalize_room(room)
+
+
+def rooms_from_json(rooms):
+    return [Room.from_json(room) for room in rooms]
+
+
+def residents_from_json(residents):
+    return [Resident.from_json(resident) for resident in residents]
+
+
+def listings_from_summary(summary):
+    """Locator records from a facility summary's "residents": [[name, room]]."""
+    return [Listing(name, room) for name, room in summary.get("residents", [])]
+
+
+def estimate_bytes(records):
+    """Rough in-memory size of a list of records (interned strings are shared, so not counted)."""
+    total = sys.getsizeof(records)
+    for record in records:
+        total += sys.getsizeof(record)
+        total += sum(sys.getsizeof(getattr(record, field)) for field in ("room", "resident", "amount") if hasattr(record, field))
+    return total
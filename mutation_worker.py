@@ -0,0 +1,111 @@
+import itertools
+import threading
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+# Event posted to the attached window whenever a mutation finishes
+DONE_EVENT = "-MUTATION-DONE-"
+
+Task = namedtuple("Task", ["task_id", "label", "result", "succeeded"])
+
+
+def has_success(result):
+    return "success" in result
+
+
+def apply_warning(error):
+    """Message for a mutation the server accepted but that couldn't be applied locally."""
+    return f"Saved, but the app's copy could not be updated ({error}). What is shown may be out of date until the data is reloaded."
+
+
+class MutationWorker:
+    """Runs API mutations on a thread pool so the GUI never waits on the network.
+
+    Finished tasks are queued and announced to whichever window is attached with
+    write_event_value(DONE_EVENT, ...). A task that finishes while no window is
+    attached (e.g. between one view closing and the next opening) is delivered
+    when the next window attaches, so no result is ever dropped.
+    """
+
+    def __init__(self, max_workers=4):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="mutation")
+        self.lock = threading.Lock()
+        self.window = None
+        self.ids = itertools.count(1)
+        self.in_flight = {}  # task id -> label
+        self.finished = deque()
+
+    def attach(self, window):
+        """Send completion events to this window from now on."""
+        with self.lock:
+            self.window = window
+            pending = bool(self.finished)
+        if pending:
+            self.post(window)
+
+    def detach(self, window):
+        with self.lock:
+            if self.window is window:
+                self.window = None
+
+    def submit(self, label, request, *args, apply=None, succeeded=has_success):
+        """Run request(*args) in the background.
+
+        If succeeded(result) is true, apply(result) runs on the same worker
+        thread (it may itself hit the network, e.g. a scoped refresh) before
+        the window is told the task is done. If only apply fails, the task
+        still succeeded (the server has the change) and carries a "warning".
+        """
+        task_id = next(self.ids)
+        with self.lock:
+            self.in_flight[task_id] = label
+        self.executor.submit(self.run, task_id, label, request, args, apply, succeeded)
+        return task_id
+
+    def run(self, task_id, label, request, args, apply, succeeded):
+        try:
+            result = request(*args)
+            ok = succeeded(result)
+        except Exception as e:
+            result, ok = {"error": str(e)}, False
+
+        if ok and apply is not None:
+            try:
+                apply(result)
+            except Exception as e:
+                result = dict(result, warning=apply_warning(e))
+
+        with self.lock:
+            del self.in_flight[task_id]
+        self.report(label, result, ok, task_id)
+
+    def report(self, label, result, succeeded, task_id=None):
+        """Queue a finished task for the window, including work done outside the pool."""
+        with self.lock:
+            self.finished.append(Task(task_id or next(self.ids), label, result, succeeded))
+            window = self.window
+        if window is not None:
+            self.post(window)
+
+    def post(self, window):
+        try:
+            window.write_event_value(DONE_EVENT, None)
+        except Exception:
+            # Window closed underneath us; the task waits for the next attach()
+            pass
+
+    def take_finished(self):
+        """Return and clear every task finished since the last call."""
+        with self.lock:
+            tasks = list(self.finished)
+            self.finished.clear()
+        return tasks
+
+    def status_text(self):
+        with self.lock:
+            labels = list(self.in_flight.values())
+        if not labels:
+            return ""
+        if len(labels) == 1:
+            return f"Saving: {labels[0]}..."
+        return f"Saving {len(labels)} changes: {labels[0]}..."
@@ -0,0 +1,203 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import namedtuple
+
+from mutation_worker import apply_warning
+
+# Durable journal of mutations, kept next to the snapshot cache
+JOURNAL_PATH = os.environ.get("HAVENLEDGER_JOURNAL", os.path.join(os.path.expanduser("~"), ".havenledger", "journal.sqlite3"))
+
+# Seconds between replay attempts while there is a backlog
+REPLAY_INTERVAL = 15
+
+Entry = namedtuple("Entry", ["entry_id", "kind", "payload", "idempotency_key", "label", "attempts", "last_error", "created_at"])
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS mutations (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    idempotency_key TEXT NOT NULL UNIQUE,
+    label TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    created_at REAL NOT NULL
+)
+"""
+
+
+class MutationJournal:
+    """SQLite log of mutations; an entry is written (and synced) before it is ever sent."""
+
+    def __init__(self, path=JOURNAL_PATH):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=FULL")
+        self.db.execute(SCHEMA)
+
+    def record(self, kind, payload, label):
+        """Durably store a new pending mutation with a fresh idempotency key."""
+        key = str(uuid.uuid4())
+        created_at = time.time()
+        with self.lock:
+            cursor = self.db.execute(
+                "INSERT INTO mutations (kind, payload, idempotency_key, label, created_at) VALUES (?, ?, ?, ?, ?)",
+                (kind, json.dumps(payload), key, label, created_at)
+            )
+        return Entry(cursor.lastrowid, kind, payload, key, label, 0, None, created_at)
+
+    def pending(self):
+        """Every pending entry, oldest first."""
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT id, kind, payload, idempotency_key, label, attempts, last_error, created_at "
+                "FROM mutations WHERE status = 'pending' ORDER BY id"
+            ).fetchall()
+        return [Entry(row[0], row[1], json.loads(row[2]), *row[3:]) for row in rows]
+
+    def mark_sent(self, entry_id):
+        """The server acknowledged the mutation; the entry is no longer needed."""
+        with self.lock:
+            self.db.execute("DELETE FROM mutations WHERE id = ?", (entry_id,))
+
+    def mark_failed(self, entry_id, error):
+        """The server rejected the mutation; it will not be retried."""
+        self.set_status(entry_id, "failed", error)
+
+    def mark_attempt(self, entry_id, error):
+        """The mutation could not reach the server; it stays pending."""
+        self.set_status(entry_id, "pending", error)
+
+    def set_status(self, entry_id, status, error=None):
+        with self.lock:
+            self.db.execute(
+                "UPDATE mutations SET status = ?, attempts = attempts + 1, last_error = ? WHERE id = ?",
+                (status, error, entry_id)
+            )
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+
+class OfflineQueue:
+    """Write-ahead queue in front of the mutation worker.
+
+    A mutation goes straight to the worker when nothing is ahead of it in the
+    journal. Otherwise it queues behind the entries still pending, including
+    one the worker is sending, since that one may yet fail and need a retry
+    (a payment must not overtake the add of its resident). A replay thread
+    sends the backlog in order, re-using each entry's idempotency key, until it
+    drains. A mutation that can't reach the server stays pending and holds up
+    the ones behind it. Backlog left over from a previous run is replayed on start().
+    """
+
+    def __init__(self, journal, worker, send, apply, replay_interval=REPLAY_INTERVAL):
+        self.journal = journal
+        self.worker = worker
+        self.send_request = send  # send(kind, payload, idempotency_key) -> result dict
+        self.apply = apply  # apply(kind, payload, result) on success
+        self.replay_interval = replay_interval
+        self.lock = threading.Lock()
+        self.sending = set()  # entry ids currently with the worker or replayer
+        self.wakeup = threading.Event()
+        self.replayer = threading.Thread(target=self.replay_loop, name="journal-replay", daemon=True)
+
+    def start(self):
+        self.replayer.start()
+        self.wakeup.set()
+
+    def submit(self, label, kind, payload):
+        """Journal a mutation, then send it now or queue it behind the earlier pending ones."""
+        entry = self.journal.record(kind, payload, label)
+        with self.lock:
+            # The replayer may already have picked it up
+            queued = entry.entry_id in self.sending or any(e.entry_id != entry.entry_id for e in self.journal.pending())
+            if not queued:
+                self.sending.add(entry.entry_id)
+        if queued:
+            self.wakeup.set()
+            return
+        self.worker.submit(label, self.send_now, entry, apply=lambda result: self.apply(kind, payload, result))
+
+    def send_now(self, entry):
+        """send() on the worker; once the entry is settled, whatever queued behind it can go."""
+        result = self.send(entry)
+        if not result.get("queued"):
+            self.wakeup.set()
+        return result
+
+    def send(self, entry):
+        """Send one journaled entry and record the outcome. Runs off the GUI thread."""
+        try:
+            try:
+                result = self.send_request(entry.kind, entry.payload, entry.idempotency_key)
+            except Exception as e:
+                # Network failures come back as retryable results; anything raised would fail again on replay
+                result = {"error": str(e)}
+
+            if "success" in result:
+                self.journal.mark_sent(entry.entry_id)
+            elif result.get("retryable"):
+                self.journal.mark_attempt(entry.entry_id, result.get("error"))
+                result = dict(result, queued=True)
+            else:
+                self.journal.mark_failed(entry.entry_id, result.get("error", "Unknown error"))
+            return result
+        finally:
+            with self.lock:
+                self.sending.discard(entry.entry_id)
+
+    def backlog(self):
+        """Pending entries that nobody is currently sending."""
+        with self.lock:
+            busy = set(self.sending)
+        return [e for e in self.journal.pending() if e.entry_id not in busy]
+
+    def replay_loop(self):
+        while True:
+            self.wakeup.wait(self.replay_interval)
+            self.wakeup.clear()
+            self.replay()
+
+    def replay(self):
+        """Send the backlog in order, stopping at the first entry that still can't get through.
+
+        An entry the worker is still sending stops it too; send_now() wakes the
+        replay again once that entry is settled.
+        """
+        for entry in self.journal.pending():
+            with self.lock:
+                if entry.entry_id in self.sending:
+                    break
+                self.sending.add(entry.entry_id)
+
+            result = self.send(entry)
+            succeeded = "success" in result
+            if succeeded:
+                try:
+                    self.apply(entry.kind, entry.payload, result)
+                except Exception as e:
+                    print(f"Error applying replayed {entry.label}: {e}")
+                    result = dict(result, warning=apply_warning(e))
+            self.worker.report(entry.label, result, succeeded)
+
+            if result.get("queued"):
+                break
+
+    def retry_now(self):
+        self.wakeup.set()
+
+    def status_text(self):
+        count = len(self.backlog())
+        if not count:
+            return ""
+        return f"{count} change{'s' if count != 1 else ''} waiting to sync"
@@ -0,0 +1,251 @@
+"""Headless month-end reports, for scheduled jobs. Needs no display.
+
+    python reports.py --output-dir reports/2026-10 --as-of 2026-10-31
+    python reports.py --facility "Oak Manor" --format csv --report overdue
+
+For each facility, writes a revenue, occupancy and overdue report, one file
+per facility, report and format (reports/<report>/<facility>.csv, with a
+short hash added where two facility names would share a file name). The
+facilities are generated in parallel. portfolio.csv/.json has one row of
+overview metrics per facility.
+
+Rows are streamed to disk as they are produced. Each file is written under
+a temporary name and renamed when it is complete, so a job that dies
+halfway never leaves a truncated report behind. Only the API, model and
+metrics modules are imported, never the GUI, so startup stays fast.
+"""
+import argparse
+import csv
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+import api_functions as api
+from aging import STATUS_COUNTERS, STATUS_NAMES, PaymentBook
+from facility_summary import FacilitySummary
+from models import residents_from_json, rooms_from_json
+
+REPORTS = ("revenue", "occupancy", "overdue")
+FORMATS = ("csv", "json")
+DEFAULT_WORKERS = 4
+
+# Up to this many facilities are fetched one slice at a time; more, and the whole portfolio is fetched at once
+SLICE_FETCH_LIMIT = 10
+
+REPORT_COLUMNS = {
+    "revenue": ["room", "resident", "monthly_payment", "due_day", "status", "periods_due", "amount_due"],
+    "occupancy": ["room", "room_type", "status", "beds", "residents", "resident_names"],
+    "overdue": ["room", "resident", "due_day", "days_past_due", "periods_due", "amount_due"],
+}
+PORTFOLIO_COLUMNS = [
+    "facility", "total_beds", "total_residents", "vacant", "partial", "occupied", "monthly_revenue",
+    "paid", "upcoming_due", "overdue", "past_due",
+]
+
+BEDS = {"Private": 1, "Semi-Private": 2}
+
+
+class ReportFile:
+    """One report, streamed row by row to a CSV and/or JSON file (a list of objects)."""
+
+    def __init__(self, path, columns, formats):
+        self.columns = columns
+        self.paths = []
+        self.files = []
+        self.csv = None
+        self.json = None
+        self.rows = 0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        if "csv" in formats:
+            self.csv = csv.writer(self.open(f"{path}.csv"))
+            self.csv.writerow(columns)
+        if "json" in formats:
+            self.json = self.open(f"{path}.json")
+            self.json.write("[")
+
+    def open(self, path):
+        self.paths.append(path)
+        f = open(f"{path}.tmp", "w", encoding="utf-8", newline="")
+        self.files.append(f)
+        return f
+
+    def write(self, row):
+        if self.csv:
+            self.csv.writerow(row)
+        if self.json:
+            self.json.write(("," if self.rows else "") + "\n" + json.dumps(dict(zip(self.columns, row))))
+        self.rows += 1
+
+    def close(self, complete=True):
+        if self.json:
+            self.json.write("\n]\n")
+        for path, f in zip(self.paths, self.files):
+            f.close()
+            if complete:
+                os.replace(f"{path}.tmp", path)
+            else:
+                os.remove(f"{path}.tmp")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close(complete=exc_type is None)
+        return False
+
+
+def file_name(facility_name):
+    """A facility name made safe to use as a file name."""
+    return re.sub(r"[^\w.-]+", "_", facility_name).strip("_") or "facility"
+
+
+def file_names(facility_names):
+    """facility -> file name, unique even where names sanitize alike ("Oak Manor", "Oak/Manor").
+
+    Colliding names (compared case-insensitively, for case-insensitive file
+    systems) each get a short hash of the facility name appended.
+    """
+    bases = {f: file_name(f) for f in facility_names}
+    counts = {}
+    for base in bases.values():
+        counts[base.lower()] = counts.get(base.lower(), 0) + 1
+    return {
+        f: base if counts[base.lower()] == 1 else f"{base}-{hashlib.sha1(f.encode('utf-8')).hexdigest()[:8]}"
+        for f, base in bases.items()
+    }
+
+
+def load_portfolio(facility_names, workers):
+    """(room_details, room_occupancy) as records for the facilities, and the names that failed to load.
+
+    Only data the server just sent (or confirmed with a 304) is used: a failed
+    request fails its facilities rather than falling back to the snapshot cache.
+    """
+    room_details, room_occupancy, failed = {}, {}, []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        if len(facility_names) <= SLICE_FETCH_LIMIT:
+            slices = {
+                f: (pool.submit(api.fetch_facility_rooms, f), pool.submit(api.fetch_facility_occupancy, f))
+                for f in facility_names
+            }
+            for f, (rooms, residents) in slices.items():
+                rooms, residents = rooms.result(), residents.result()
+                if rooms is None or residents is None:
+                    failed.append(f)
+                else:
+                    room_details[f], room_occupancy[f] = rooms, residents
+        else:
+            rooms = pool.submit(api.fetch_room_details, current_only=True)
+            residents = pool.submit(api.fetch_room_occupancy, current_only=True)
+            all_rooms, all_residents = rooms.result(), residents.result()
+            if all_rooms is None or all_residents is None:
+                failed.extend(facility_names)
+            else:
+                # A facility with no rooms or residents yet is simply absent
+                for f in facility_names:
+                    room_details[f], room_occupancy[f] = all_rooms.get(f, []), all_residents.get(f, [])
+
+    room_details = {f: rooms_from_json(rooms) for f, rooms in room_details.items()}
+    room_occupancy = {f: residents_from_json(residents) for f, residents in room_occupancy.items()}
+    return room_details, room_occupancy, failed
+
+
+def facility_reports(facility_name, base, rooms, residents, as_of, args):
+    """Write one facility's reports to files named base; returns its payment counters and amount past due as of the date."""
+    book = PaymentBook({facility_name: residents})
+    aging = book.evaluate(as_of)
+
+    if "revenue" in args.report:
+        with ReportFile(os.path.join(args.output_dir, "revenue", base), REPORT_COLUMNS["revenue"], args.format) as report:
+            for i, r in enumerate(residents):
+                report.write([
+                    r.room, r.resident, r.amount, r.due_day, STATUS_NAMES[aging.status[i]],
+                    int(aging.periods_due[i]), float(aging.amount_due[i]),
+                ])
+
+    if "occupancy" in args.report:
+        names = {}
+        for r in residents:
+            names.setdefault(r.room, []).append(r.resident)
+        with ReportFile(os.path.join(args.output_dir, "occupancy", base), REPORT_COLUMNS["occupancy"], args.format) as report:
+            for room in rooms:
+                in_room = names.get(room.room, [])
+                report.write([room.room, room.room_type, room.status, BEDS.get(room.room_type, 1), len(in_room), "; ".join(in_room)])
+
+    if "overdue" in args.report:
+        with ReportFile(os.path.join(args.output_dir, "overdue", base), REPORT_COLUMNS["overdue"], args.format) as report:
+            for i, days, amount in book.overdue(aging):
+                r = residents[i]
+                report.write([r.room, r.resident, r.due_day, days, int(aging.periods_due[i]), amount])
+
+    return book.facility_rows(aging)[facility_name]
+
+
+def write_portfolio(path, facility_names, facility_info, summary, payments, formats):
+    """The overview metrics of every facility, then an "All Facilities" total row."""
+    totals = dict.fromkeys(PORTFOLIO_COLUMNS[1:], 0)
+    with ReportFile(path, PORTFOLIO_COLUMNS, formats) as report:
+        for f in facility_names:
+            values = dict(summary.get(f, {}))
+            values.update({counter: payments[f][counter] for counter in STATUS_COUNTERS.values()})
+            values["past_due"] = payments[f]["past_due"]
+            values["total_beds"] = facility_info.get(f, {}).get("total_beds", 0)
+            row = [values.get(column, 0) for column in PORTFOLIO_COLUMNS[1:]]
+            for column, value in zip(PORTFOLIO_COLUMNS[1:], row):
+                totals[column] += value or 0
+            report.write([f] + row)
+        report.write(["All Facilities"] + list(totals.values()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write HavenLedger revenue, occupancy and overdue reports without the GUI.")
+    parser.add_argument("--output-dir", default="reports")
+    parser.add_argument("--format", nargs="+", choices=FORMATS, default=list(FORMATS))
+    parser.add_argument("--report", nargs="+", choices=REPORTS, default=list(REPORTS))
+    parser.add_argument("--facility", action="append", help="Only this facility (repeatable); default all")
+    parser.add_argument("--as-of", type=date.fromisoformat, default=date.today(), help="Date payments are evaluated on (YYYY-MM-DD)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--api-url", help=f"API base URL (default {api.API_URL})")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.api_url:
+        api.configure_client(args.api_url)
+
+    facility_info = api.fetch_facility_info(current_only=True)
+    if facility_info is None:
+        print("Could not fetch the facility list.", file=sys.stderr)
+        sys.exit(1)
+    unknown = [f for f in args.facility or () if f not in facility_info]
+    if unknown:
+        parser.error(f"Unknown facility: {', '.join(unknown)}")
+    facility_names = args.facility or list(facility_info)
+
+    room_details, room_occupancy, failed = load_portfolio(facility_names, args.workers)
+    loaded = [f for f in facility_names if f not in failed]
+    summary = FacilitySummary(room_details, room_occupancy)
+    bases = file_names(loaded)
+
+    with ThreadPoolExecutor(max_workers=args.workers, thread_name_prefix="report") as pool:
+        futures = {
+            f: pool.submit(facility_reports, f, bases[f], room_details[f], room_occupancy[f], args.as_of, args)
+            for f in loaded
+        }
+        payments = {f: future.result() for f, future in futures.items()}
+
+    print(f"Wrote reports for {len(loaded)} facilities as of {args.as_of.isoformat()} to {args.output_dir} "
+          f"in {time.perf_counter() - start:.2f}s")
+    if failed:
+        # An incomplete portfolio total would look like a complete one, so it isn't written
+        print(f"Could not load {len(failed)} facilities: {', '.join(failed)}; portfolio report not written", file=sys.stderr)
+        sys.exit(1)
+    write_portfolio(os.path.join(args.output_dir, "portfolio"), loaded, facility_info, summary, payments, args.format)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+import bisect
+import heapq
+import threading
+import unicodedata
+from collections import namedtuple
+
+# Ranking, best first; fuzzy matches score below SUBSTRING by their closeness
+EXACT, PREFIX, TOKEN_PREFIX, SUBSTRING = 4, 3, 2, 1
+FUZZY_EXACT_TOKEN, FUZZY_PREFIX_TOKEN, FUZZY_TYPO_TOKEN = 0.9, 0.8, 0.6
+
+# order: how matches with equal scores are ranked (by name, then facility and room)
+Entry = namedtuple("Entry", ["name", "facility", "room", "norm", "tokens", "order"])
+Match = namedtuple("Match", ["name", "facility", "room", "score"])
+
+
+def normalize(text):
+    """Case-fold, strip accents and collapse whitespace so "José  Smith" matches "jose smith"."""
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return " ".join(text.casefold().split())
+
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def deletes(token):
+    """The token plus every variant with one character removed (for 1-typo matching)."""
+    variants = {token}
+    if len(token) > 1:
+        variants.update(token[:i] + token[i + 1:] for i in range(len(token)))
+    return variants
+
+
+def within_one_edit(a, b):
+    """True if a and b differ by at most one insertion, deletion, substitution or transposition."""
+    if abs(len(a) - len(b)) > 1:
+        return False
+    i = 0
+    while i < min(len(a), len(b)) and a[i] == b[i]:
+        i += 1
+    return (
+        a[i + 1:] == b[i + 1:]  # Substitution (or equal)
+        or a[i + 1:] == b[i:]  # Deletion from a
+        or a[i:] == b[i + 1:]  # Insertion into a
+        or (a[i + 2:] == b[i + 2:] and a[i:i + 2] == b[i:i + 2][::-1])  # Transposition
+    )
+
+
+class ResidentIndex:
+    """In-memory search index over every resident in the portfolio.
+
+    Supports prefix (whole name or any word), substring and one-typo-per-word
+    fuzzy matching. Built once from the store's resident directory (facility
+    -> records with .resident and .room), then kept up to date per facility
+    through on_change() as the data store changes.
+    """
+
+    def __init__(self, residents):
+        self.residents = residents
+        self.lock = threading.Lock()
+        self.next_id = 0
+        self.entries = {}  # id -> Entry
+        self.by_facility = {}  # facility -> set of ids
+        self.name_keys = []  # sorted (full name, id)
+        self.words = []  # sorted distinct words (the keys of token_ids)
+        self.trigram_ids = {}  # trigram -> set of ids
+        self.token_ids = {}  # word -> set of ids
+        self.delete_tokens = {}  # one-deletion variant -> set of words
+        self.build()
+
+    def build(self):
+        with self.lock:
+            self.next_id = 0
+            self.entries.clear()
+            self.by_facility.clear()
+            self.name_keys.clear()
+            self.words.clear()
+            self.trigram_ids.clear()
+            self.token_ids.clear()
+            self.delete_tokens.clear()
+
+            for facility, residents in self.residents.items():
+                for res in residents:
+                    self.add_entry(facility, res.room, res.resident, sort=False)
+            self.name_keys.sort()
+            self.words.sort()
+
+    def on_change(self, dataset, facility_name=None, changes=None):
+        """Data store listener: reindex one facility, or everything after a full reload."""
+        if dataset not in ("room_occupancy", "resident_directory"):
+            return
+        if facility_name is None:
+            self.build()
+        else:
+            self.reindex_facility(facility_name)
+
+    def reindex_facility(self, facility_name):
+        with self.lock:
+            for entry_id in list(self.by_facility.get(facility_name, ())):
+                self.remove_entry(entry_id)
+            for res in self.residents.get(facility_name, []):
+                self.add_entry(facility_name, res.room, res.resident)
+
+    def add_entry(self, facility, room, name, sort=True):
+        norm = normalize(name)
+        tokens = tuple(norm.split())
+        entry_id = self.next_id
+        self.next_id += 1
+
+        self.entries[entry_id] = Entry(name, facility, room, norm, tokens, (norm, facility, str(room)))
+        self.by_facility.setdefault(facility, set()).add(entry_id)
+
+        if sort:
+            bisect.insort(self.name_keys, (norm, entry_id))
+        else:
+            self.name_keys.append((norm, entry_id))
+        for gram in trigrams(norm):
+            self.trigram_ids.setdefault(gram, set()).add(entry_id)
+        for token in tokens:
+            if token not in self.token_ids:
+                self.token_ids[token] = set()
+                if sort:
+                    bisect.insort(self.words, token)
+                else:
+                    self.words.append(token)
+                for variant in deletes(token):
+                    self.delete_tokens.setdefault(variant, set()).add(token)
+            self.token_ids[token].add(entry_id)
+
+    def remove_entry(self, entry_id):
+        entry = self.entries.pop(entry_id)
+        self.by_facility[entry.facility].discard(entry_id)
+
+        i = bisect.bisect_left(self.name_keys, (entry.norm, entry_id))
+        if i < len(self.name_keys) and self.name_keys[i] == (entry.norm, entry_id):
+            del self.name_keys[i]
+        for gram in trigrams(entry.norm):
+            ids = self.trigram_ids[gram]
+            ids.discard(entry_id)
+            if not ids:
+                del self.trigram_ids[gram]
+        for token in entry.tokens:
+            ids = self.token_ids.get(token)
+            if ids is None:
+                continue
+            ids.discard(entry_id)
+            if not ids:
+                del self.token_ids[token]
+                del self.words[bisect.bisect_left(self.words, token)]
+                for variant in deletes(token):
+                    words = self.delete_tokens[variant]
+                    words.discard(token)
+                    if not words:
+                        del self.delete_tokens[variant]
+
+    def search(self, query, limit=20):
+        """Return Match tuples for a query, best match first (all of them if limit is None).
+
+        Each matcher only scores below the previous one, so once `limit` matches
+        are found the weaker matchers are skipped.
+        """
+        q = normalize(query)
+        if not q:
+            return []
+
+        with self.lock:
+            scores = {}
+            self.match_prefix(q, scores, limit)
+            if len(q) >= 3 and (limit is None or len(scores) < limit):
+                self.match_substring(q, scores)
+            if limit is None or len(scores) < limit:
+                self.match_fuzzy(q, scores)
+
+            entries = self.entries
+
+            def rank(item):
+                return -item[1], entries[item[0]].order
+
+            if limit is None:
+                ranked = sorted(scores.items(), key=rank)
+            else:
+                ranked = heapq.nsmallest(limit, scores.items(), key=rank)
+            return [
+                Match(self.entries[i].name, self.entries[i].facility, self.entries[i].room, score)
+                for i, score in ranked
+            ]
+
+    def match_prefix(self, q, scores, limit=None):
+        """Whole-name prefixes, then word prefixes.
+
+        Names are scanned in rank order (EXACT sorts first, then PREFIX by
+        name), so the scan stops once `limit` are found, past any ties with the
+        last; word prefixes only score TOKEN_PREFIX, so then they aren't needed.
+        """
+        i = bisect.bisect_left(self.name_keys, (q, -1))
+        last = None
+        while i < len(self.name_keys) and self.name_keys[i][0].startswith(q):
+            norm, entry_id = self.name_keys[i]
+            if limit is not None and len(scores) >= limit and norm != last:
+                return
+            scores[entry_id] = EXACT if norm == q else PREFIX
+            last = norm
+            i += 1
+        if limit is not None and len(scores) >= limit:
+            return
+
+        ids = set()
+        for word in self.words_with_prefix(q):
+            ids |= self.token_ids[word]
+        for entry_id in ids:
+            scores.setdefault(entry_id, TOKEN_PREFIX)
+
+    def words_with_prefix(self, prefix):
+        i = bisect.bisect_left(self.words, prefix)
+        while i < len(self.words) and self.words[i].startswith(prefix):
+            yield self.words[i]
+            i += 1
+
+    def match_substring(self, q, scores):
+        grams = sorted((self.trigram_ids.get(g, set()) for g in trigrams(q)), key=len)
+        if not grams or not grams[0]:
+            return
+        candidates = set(grams[0]).intersection(*grams[1:])
+        for entry_id in candidates:
+            if entry_id not in scores and q in self.entries[entry_id].norm:
+                scores[entry_id] = SUBSTRING
+
+    def match_fuzzy(self, q, scores):
+        """Every query word must match a word of the name exactly, by one typo,
+        or (for the word still being typed) as a prefix."""
+        words = q.split()
+        per_word = []
+        for position, word in enumerate(words):
+            typing = position == len(words) - 1
+            matches = self.fuzzy_tokens(word, typing)
+            if not matches:
+                return
+            per_word.append(matches)
+
+        candidates = None
+        for matches in per_word:
+            ids = set()
+            for token in matches:
+                ids |= self.token_ids.get(token, set())
+            candidates = ids if candidates is None else candidates & ids
+            if not candidates:
+                return
+
+        for entry_id in candidates:
+            if entry_id in scores:
+                continue
+            tokens = self.entries[entry_id].tokens
+            score = sum(max(matches.get(t, 0) for t in tokens) for matches in per_word) / len(per_word)
+            scores[entry_id] = score
+
+    def fuzzy_tokens(self, word, typing):
+        """Indexed words close to `word`, mapped to how closely they match."""
+        matches = {}
+        for variant in deletes(word):
+            for token in self.delete_tokens.get(variant, ()):
+                if token == word:
+                    matches[token] = FUZZY_EXACT_TOKEN
+                elif token not in matches and within_one_edit(word, token):
+                    matches[token] = FUZZY_TYPO_TOKEN
+        if typing:
+            for token in self.words_with_prefix(word):
+                matches.setdefault(token, FUZZY_PREFIX_TOKEN)
+        return matches
@@ -0,0 +1,123 @@
+import threading
+
+
+def room_color(room):
+    """Button color for a room: red when vacant, otherwise by room type."""
+    if room.status == "Vacant":
+        return "red"
+    elif room.room_type == "Semi-Private":
+        return "yellow"
+    else:  # Private
+        return "green"
+
+
+def room_button(room):
+    return room.room, f"Room {room.room}\n{room.room_type}", room_color(room)
+
+
+class RoomIndex:
+    """Room buttons and residents indexed by (facility, room number).
+
+    Built once per data load, then kept current through on_change() as the
+    data store changes, so opening a room or facility is a dict lookup rather
+    than a scan. Room button labels and colors are precomputed per room, and
+    table rows are built once per change to a facility's residents and
+    shared by every view that shows them until the next change.
+    """
+
+    def __init__(self, room_details, room_occupancy):
+        self.room_details = room_details
+        self.room_occupancy = room_occupancy
+        self.lock = threading.Lock()
+        self.buttons = {}  # facility -> {room number -> (room number, label, color)}
+        self.residents = {}  # facility -> {room number -> [resident records]}
+        self.rows = {}  # facility -> payment table rows, until its residents change
+        self.room_rows = {}  # facility -> {room number -> resident table rows}, until its residents change
+        self.build()
+
+    def build(self):
+        with self.lock:
+            self.buttons.clear()
+            self.residents.clear()
+            self.rows.clear()
+            self.room_rows.clear()
+            for facility in self.room_details:
+                self.index_rooms(facility)
+            for facility in self.room_occupancy:
+                self.index_residents(facility)
+
+    def index_rooms(self, facility):
+        buttons = self.buttons[facility] = {}
+        for room in self.room_details.get(facility, []):
+            buttons[room.room] = room_button(room)
+
+    def index_residents(self, facility):
+        self.drop_rows(facility)
+        by_room = self.residents[facility] = {}
+        for resident in self.room_occupancy.get(facility, []):
+            by_room.setdefault(resident.room, []).append(resident)
+
+    def on_change(self, dataset, facility_name=None, changes=None):
+        """Data store listener: apply changed records, or reindex a replaced facility slice."""
+        if dataset == "evicted":
+            with self.lock:
+                for index in (self.buttons, self.residents):
+                    index.pop(facility_name, None)
+                self.drop_rows(facility_name)
+            return
+        if dataset not in ("room_details", "room_occupancy"):
+            return
+        if facility_name is None:
+            self.build()
+            return
+
+        with self.lock:
+            if dataset == "room_details":
+                if changes is None or facility_name not in self.buttons:
+                    self.index_rooms(facility_name)
+                    return
+                for old, new in changes:
+                    if old is not None and new is None:
+                        self.buttons[facility_name].pop(old.room, None)
+                    if new is not None:
+                        self.buttons[facility_name][new.room] = room_button(new)
+            else:
+                if changes is None or facility_name not in self.residents:
+                    self.index_residents(facility_name)
+                    return
+                by_room = self.residents[facility_name]
+                self.drop_rows(facility_name)
+                for old, new in changes:
+                    if old is not None:
+                        in_room = by_room.get(old.room, [])
+                        if old in in_room:
+                            in_room.remove(old)
+                    if new is not None:
+                        by_room.setdefault(new.room, []).append(new)
+
+    def drop_rows(self, facility):
+        self.rows.pop(facility, None)
+        self.room_rows.pop(facility, None)
+
+    def room_buttons(self, facility_name):
+        """(room number, label, color) for every room of a facility, in API order."""
+        return list(self.buttons.get(facility_name, {}).values())
+
+    def payment_rows(self, facility_name):
+        """Payment table rows for a facility, in API order (the same list until its residents change)."""
+        with self.lock:
+            rows = self.rows.get(facility_name)
+            if rows is None:
+                residents = self.room_occupancy.get(facility_name, [])
+                rows = self.rows[facility_name] = [r.payment_row() for r in residents]
+            return rows
+
+    def resident_rows(self, facility_name, room_number):
+        """Resident table rows for a room (the same list until the facility's residents change)."""
+        with self.lock:
+            by_room = self.room_rows.setdefault(facility_name, {})
+            rows = by_room.get(room_number)
+            if rows is None:
+                residents = self.residents.get(facility_name, {}).get(room_number, ())
+                rows = by_room[room_number] = [r.room_row() for r in residents]
+            return rows
@@ -0,0 +1,52 @@
+import math
+from datetime import date
+
+# Field checks shared by the data-entry windows and bulk import.
+# Each returns (cleaned values, None) when valid, or (None, error message).
+
+
+def validate_facility(facility_name, total_beds):
+    facility_name = str(facility_name).strip()
+    total_beds = str(total_beds).strip()
+    if not facility_name or not total_beds.isdigit():
+        return None, "Please enter a valid facility name and number of beds."
+    return {"facility_name": facility_name, "total_beds": int(total_beds)}, None
+
+
+def validate_room(room_number):
+    room_number = str(room_number).strip()
+    if not room_number:
+        return None, "Please enter a room number."
+    return {"room_number": room_number}, None
+
+
+def validate_resident(resident_name, monthly_payment, payment_due_date, move_in_date):
+    resident_name = str(resident_name).strip()
+    monthly_payment = str(monthly_payment).replace(",", "").replace("$", "").strip()  # Remove commas
+    payment_due_date = str(payment_due_date).strip()
+    move_in_date = str(move_in_date).strip()
+
+    if not resident_name or not monthly_payment or not payment_due_date or not move_in_date:
+        return None, "Please fill in all fields."
+
+    try:
+        monthly_payment = float(monthly_payment)  # Convert to a valid number
+    except ValueError:
+        return None, "Invalid payment amount. Please enter a valid number."
+    if not math.isfinite(monthly_payment) or monthly_payment < 0:  # float() also accepts "nan" and "inf"
+        return None, "Invalid payment amount. Please enter a valid number."
+
+    if not payment_due_date.isdigit() or not 1 <= int(payment_due_date) <= 31:
+        return None, "Payment due date must be a day of the month (1-31)."
+
+    try:
+        date.fromisoformat(move_in_date)
+    except ValueError:
+        return None, "Move-in date must be in YYYY-MM-DD format."
+
+    return {
+        "resident_name": resident_name,
+        "monthly_payment": monthly_payment,
+        "payment_due_date": payment_due_date,
+        "move_in_date": move_in_date
+    }, None